@@ -5,7 +5,6 @@ const BOOKING_API = '/bookings';
 
 // Socket instance
 let socket: Socket | null = null;
-let bookingServiceUrl: string | null = null;
 
 // Types
 export interface LockedSeat {
@@ -130,22 +129,14 @@ export interface BookedSeatsResponse {
   };
 }
 
-// Get booking service URL from API Gateway (for WebSocket connection)
-async function getBookingServiceUrl(): Promise<string> {
-  if (bookingServiceUrl) {
-    return bookingServiceUrl;
-  }
-
-  try {
-    const url = await api.get<string>(`${BOOKING_API}/`);
-    // Remove quotes if present
-    bookingServiceUrl = typeof url === 'string' ? url.replace(/"/g, '') : 'http://localhost:8004';
-    return bookingServiceUrl;
-  } catch (error) {
-    console.error('Error getting booking service URL:', error);
-    // Fallback to default
-    return 'http://localhost:8004';
-  }
+// Socket.IO goes through the API Gateway (JWT checked at the WebSocket handshake)
+function getRealtimeEndpoint(): { origin: string; path: string } {
+  // VITE_API_URL may be relative (e.g. /api/v1 behind nginx)
+  const gateway = new URL(import.meta.env.VITE_API_URL || 'http://localhost:8000/api/v1', window.location.origin);
+  return {
+    origin: gateway.origin,
+    path: `${gateway.pathname.replace(/\/$/, '')}/realtime/socket.io`,
+  };
 }
 
 // Connect to Socket.IO
@@ -154,10 +145,19 @@ export async function connectSocket(): Promise<Socket> {
     return socket;
   }
 
-  const serviceUrl = await getBookingServiceUrl();
+  const { origin, path } = getRealtimeEndpoint();
+
+  const token = localStorage.getItem('token') || '';
 
-  socket = io(serviceUrl, {
+  // WebSocket first, long-polling if it cannot be opened (proxy without upgrade support...).
+  // Browsers cannot set headers on WebSocket, so the handshake sends the token in the query string;
+  // polling requests are plain HTTP through the gateway and carry the Authorization header.
+  socket = io(origin, {
+    path,
     transports: ['websocket', 'polling'],
+    tryAllTransports: true,
+    query: { token },
+    extraHeaders: token ? { Authorization: `Bearer ${token}` } : {},
     reconnection: true,
     reconnectionAttempts: 5,
     reconnectionDelay: 1000,
@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import logging
+import logging.handlers
+from typing import Optional
+from dotenv import load_dotenv
+from app.metrics import registry, Counter
+
+load_dotenv()
+
+ACCESS_LOG_ENABLED = os.getenv("ACCESS_LOG_ENABLED", "true").lower() in ("1", "true", "yes")
+# Tỉ lệ ghi log request thành công (2xx/3xx); lỗi (>= 400) và request chậm luôn được ghi
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", 0.1))
+ACCESS_LOG_SLOW_MS = float(os.getenv("ACCESS_LOG_SLOW_MS", 1000))
+ACCESS_LOG_QUEUE_SIZE = int(os.getenv("ACCESS_LOG_QUEUE_SIZE", 10000))
+# Mặc định ghi ra stdout; đặt ACCESS_LOG_FILE để ghi ra file
+ACCESS_LOG_FILE = os.getenv("ACCESS_LOG_FILE")
+
+ACCESS_LOG_DROPPED = registry.register(Counter(
+    "gateway_access_log_dropped_total", "Access log entries dropped because the log queue was full",
+))
+
+logger = logging.getLogger("gateway.access")
+logger.propagate = False
+logger.setLevel(logging.INFO)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler không chặn: queue đầy thì bỏ entry (đếm vào metric) thay vì đợi ghi log"""
+
+    def prepare(self, record):
+        # Entry là dict, format thành JSON ở thread ghi log chứ không phải trên event loop
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            ACCESS_LOG_DROPPED.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg, separators=(",", ":"), default=str)
+
+
+_queue: "queue.Queue" = queue.Queue(maxsize=ACCESS_LOG_QUEUE_SIZE)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def start():
+    """Bật thread ghi access log (gọi trong lifespan)"""
+    global _listener
+    if not ACCESS_LOG_ENABLED or _listener is not None:
+        return
+    if ACCESS_LOG_FILE:
+        handler = logging.FileHandler(ACCESS_LOG_FILE)
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(_queue, handler)
+    _listener.start()
+    logger.addHandler(_DroppingQueueHandler(_queue))
+
+
+def stop():
+    """Ghi nốt các entry còn trong queue rồi dừng thread"""
+    global _listener
+    if _listener is None:
+        return
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    _listener.stop()
+    _listener = None
+
+
+def should_log(status: int, elapsed_ms: float) -> bool:
+    if status >= 400 or elapsed_ms >= ACCESS_LOG_SLOW_MS:
+        return True
+    return random.random() < ACCESS_LOG_SAMPLE_RATE
+
+
+def record(scope, status: int, elapsed: float, route: str, upstream: str, bytes_out: int, timings: dict):
+    """Gọi từ MetricsMiddleware sau mỗi request; chỉ dựng entry khi request được chọn ghi"""
+    if _listener is None:
+        return
+    elapsed_ms = elapsed * 1000
+    if not should_log(status, elapsed_ms):
+        return
+    bytes_in = 0
+    for name, value in scope["headers"]:
+        if name == b"content-length":
+            bytes_in = int(value) if value.isdigit() else 0
+            break
+    upstream_ms = timings.get("upstream", 0.0) * 1000
+    auth_ms = timings.get("auth", 0.0) * 1000
+    client = scope.get("client")
+    logger.info({
+        "ts": time.time(),
+        "method": scope["method"],
+        "path": scope["path"],
+        "route": route,
+        "status": status,
+        "upstream": upstream or None,
+        "client": client[0] if client else None,
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "duration_ms": round(elapsed_ms, 2),
+        "auth_ms": round(auth_ms, 3),
+        "upstream_ms": round(upstream_ms, 2),
+        "connect_ms": round(timings.get("connect", 0.0) * 1000, 2),
+        "gateway_ms": round(max(0.0, elapsed_ms - upstream_ms - auth_ms), 2),
+        "sampled": status < 400 and elapsed_ms < ACCESS_LOG_SLOW_MS,
+    })
@@ -0,0 +1,195 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+from urllib.parse import urlencode
+from starlette.responses import Response
+from dotenv import load_dotenv
+from app.metrics import register_collector
+
+load_dotenv()
+
+# Route catalog công khai có thể bật cache: tên route -> prefix path ở upstream
+CACHEABLE_ROUTES: Dict[str, str] = {
+    "movies": "/api/v1/movies/",
+    "cinemas": "/api/v1/cinemas/",
+    "showtimes": "/api/v1/showtimes/",
+    "advertisements": "/api/v1/advertisements/",
+}
+
+# Path con trả dữ liệu sống không bao giờ được cache: ghế của suất chiếu do seatbooking-service
+# ghi (booking) và gateway không purge được khi booking thay đổi
+UNCACHED_SUFFIXES: Dict[str, Tuple[str, ...]] = {
+    "showtimes": ("/seats",),
+}
+
+# Header của upstream không được lưu vào cache
+_UNCACHED_HEADERS = {"content-length", "content-encoding", "set-cookie", "date"}
+
+
+class CacheEntry:
+    __slots__ = ("status_code", "headers", "body", "stored_at", "fresh_until", "stale_until", "size")
+
+    def __init__(self, status_code: int, headers: dict, body: bytes, ttl: float, stale_ttl: float):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.stored_at = time.monotonic()
+        self.fresh_until = self.stored_at + ttl
+        self.stale_until = self.fresh_until + stale_ttl
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers.items())
+
+    def to_response(self, cache_status: str) -> Response:
+        response = Response(content=self.body, status_code=self.status_code, headers=self.headers)
+        response.headers["X-Cache"] = cache_status
+        response.headers["Age"] = str(int(time.monotonic() - self.stored_at))
+        return response
+
+
+class ResponseCache:
+    """Cache response GET ở gateway: TTL, giới hạn bộ nhớ theo LRU và stale-while-revalidate.
+
+    Cache nằm trong bộ nhớ của từng worker; mỗi worker uvicorn có cache riêng.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float, max_bytes: int, enabled_routes: Set[str]):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.enabled_routes = set(enabled_routes)
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._size = 0
+        self._refreshing: Set[str] = set()
+        # Tăng mỗi lần purge để bỏ kết quả refresh đã bắt đầu trước đó
+        self.generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(path: str, query_params) -> str:
+        """Key = path + query string đã chuẩn hoá (sắp xếp, bỏ param rỗng)"""
+        items = sorted((k, v) for k, v in query_params.multi_items() if v != "")
+        return f"{path}?{urlencode(items)}" if items else path
+
+    def is_enabled(self, route: str, path: Optional[str] = None) -> bool:
+        """Route bật cache; có path thì path đó còn phải không nằm trong UNCACHED_SUFFIXES"""
+        if route not in self.enabled_routes:
+            return False
+        if path is not None:
+            return not path.rstrip("/").endswith(UNCACHED_SUFFIXES.get(route, ()))
+        return True
+
+    def set_enabled(self, route: str, enabled: bool):
+        if enabled:
+            self.enabled_routes.add(route)
+        else:
+            self.enabled_routes.discard(route)
+            self.purge_prefix(CACHEABLE_ROUTES[route])
+
+    def get(self, key: str) -> Tuple[Optional[CacheEntry], bool]:
+        """Trả về (entry, còn fresh hay không); entry quá hạn stale bị xoá"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        now = time.monotonic()
+        if now > entry.stale_until:
+            self._remove(key)
+            self.misses += 1
+            return None, False
+        self._entries.move_to_end(key)
+        if now <= entry.fresh_until:
+            self.hits += 1
+            return entry, True
+        self.stale_hits += 1
+        return entry, False
+
+    def set(self, key: str, status_code: int, headers, body: bytes, generation: Optional[int] = None):
+        if generation is not None and generation != self.generation:
+            return
+        kept = {k: v for k, v in headers.items() if k.lower() not in _UNCACHED_HEADERS}
+        entry = CacheEntry(status_code, kept, body, self.ttl, self.stale_ttl)
+        if entry.size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._size += entry.size
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def purge_prefix(self, prefix: str) -> int:
+        """Xoá mọi entry có path bắt đầu bằng prefix, trả về số entry đã xoá"""
+        self.generation += 1
+        keys = [k for k in self._entries if k.startswith(prefix)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def purge_all(self) -> int:
+        self.generation += 1
+        count = len(self._entries)
+        self._entries.clear()
+        self._size = 0
+        return count
+
+    def schedule_refresh(self, key: str, fetch: Callable[[], Awaitable[None]]):
+        """Revalidate entry stale ở background, mỗi key chỉ một lần refresh tại một thời điểm"""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def _run():
+            try:
+                await fetch()
+            except Exception:
+                # Giữ entry stale, lần request sau sẽ thử lại
+                pass
+            finally:
+                self._refreshing.discard(key)
+
+        asyncio.create_task(_run())
+
+    def stats(self) -> dict:
+        return {
+            "enabled_routes": sorted(self.enabled_routes),
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def is_cacheable(status_code: int, headers) -> bool:
+    if status_code != 200 or "set-cookie" in headers:
+        return False
+    cache_control = headers.get("cache-control", "").lower()
+    return "no-store" not in cache_control and "private" not in cache_control
+
+
+response_cache = ResponseCache(
+    ttl=float(os.getenv("EDGE_CACHE_TTL", 300)),
+    stale_ttl=float(os.getenv("EDGE_CACHE_STALE_TTL", 600)),
+    max_bytes=int(os.getenv("EDGE_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    enabled_routes={r.strip() for r in os.getenv("EDGE_CACHE_ROUTES", "").split(",") if r.strip() in CACHEABLE_ROUTES},
+)
+
+register_collector(
+    "gateway_edge_cache", "Edge response cache statistics", ("stat",),
+    lambda: {(k,): v for k, v in response_cache.stats().items() if isinstance(v, (int, float))},
+)
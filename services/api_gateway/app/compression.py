@@ -0,0 +1,143 @@
+import os
+import zlib
+import anyio
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli là tuỳ chọn, không có thì chỉ dùng gzip
+    brotli = None
+
+# Body nhỏ hơn ngưỡng này không nén (header gzip/br làm body nhỏ to hơn)
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+# Body/chunk lớn hơn ngưỡng này được nén trong thread pool để không chặn event loop
+OFFLOAD_SIZE = int(os.getenv("COMPRESSION_OFFLOAD_SIZE", 256 * 1024))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Chọn encoding từ Accept-Encoding (ưu tiên br, rồi gzip); bỏ qua encoding có q=0"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._obj.process(data)
+            return out + (self._obj.finish() if final else self._obj.flush())
+        out = self._obj.compress(data)
+        return out + self._obj.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """Nén response (gzip/brotli) theo Accept-Encoding của client.
+
+    - Bỏ qua response đã có Content-Encoding (upstream đã nén), 204/304 và kiểu không nén được.
+    - ETag strong của response được nén chuyển thành weak.
+    - Response một phần: nén nếu body >= MIN_SIZE.
+    - StreamingResponse: nén từng chunk và flush để client nhận dữ liệu ngay.
+    - Body/chunk >= OFFLOAD_SIZE được nén trong thread pool.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "compressor": None, "passthrough": False}
+
+        async def run(compressor: _Compressor, data: bytes, final: bool) -> bytes:
+            if len(data) >= OFFLOAD_SIZE:
+                return await anyio.to_thread.run_sync(compressor.compress, data, final)
+            return compressor.compress(data, final)
+
+        async def send_wrapper(message):
+            if state["passthrough"]:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    message["status"] in (204, 304)
+                    or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    state["passthrough"] = True
+                    await send(message)
+                else:
+                    state["start"] = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            start = state["start"]
+
+            if start is not None:
+                state["start"] = None
+                if not more_body and len(body) < MIN_SIZE:
+                    state["passthrough"] = True
+                    await send(start)
+                    await send(message)
+                    return
+                start["headers"] = list(start["headers"])
+                headers = MutableHeaders(raw=start["headers"])
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                # Body nén khác từng byte với bản gốc nên ETag strong chuyển thành weak;
+                # If-None-Match so sánh weak nên vẫn khớp ETag gốc
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["etag"] = "W/" + etag
+                state["compressor"] = _Compressor(encoding)
+                if more_body:
+                    del headers["content-length"]
+                else:
+                    body = await run(state["compressor"], body, True)
+                    headers["content-length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+
+            compressed = await run(state["compressor"], body, not more_body)
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,114 @@
+import os
+from typing import List, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "*" hoặc danh sách origin cách nhau bởi dấu phẩy
+CORS_ALLOW_ORIGINS = [o.strip() for o in os.getenv("CORS_ALLOW_ORIGINS", "*").split(",") if o.strip()]
+CORS_ALLOW_METHODS = os.getenv("CORS_ALLOW_METHODS", "GET, POST, PUT, PATCH, DELETE, OPTIONS")
+# "*" = cho phép mọi header client xin trong Access-Control-Request-Headers
+CORS_ALLOW_HEADERS = os.getenv("CORS_ALLOW_HEADERS", "*")
+CORS_ALLOW_CREDENTIALS = os.getenv("CORS_ALLOW_CREDENTIALS", "true").lower() in ("1", "true", "yes")
+CORS_EXPOSE_HEADERS = os.getenv("CORS_EXPOSE_HEADERS", "")
+# Trình duyệt cache kết quả preflight trong chừng này giây (Chrome giới hạn 7200)
+CORS_MAX_AGE = int(os.getenv("CORS_MAX_AGE", 7200))
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+class CORSMiddleware:
+    """CORS ở gateway, header được dựng sẵn một lần lúc khởi động.
+
+    - Mọi request OPTIONS được trả lời ngay tại gateway (không proxy, không verify JWT):
+      preflight nhận 204 kèm Access-Control-Max-Age để trình duyệt cache.
+    - Response thường có Origin: thay header Access-Control-* của upstream bằng header của gateway.
+    - Request không có Origin (server-to-server) đi qua nguyên vẹn.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.allow_all = "*" in CORS_ALLOW_ORIGINS
+        self.origins = frozenset(CORS_ALLOW_ORIGINS)
+        # Có credentials thì trình duyệt không chấp nhận "*", phải trả lại đúng origin
+        self.echo_origin = CORS_ALLOW_CREDENTIALS or not self.allow_all
+        self.echo_request_headers = CORS_ALLOW_HEADERS.strip() == "*"
+
+        common: Headers = []
+        if CORS_ALLOW_CREDENTIALS:
+            common.append((b"access-control-allow-credentials", b"true"))
+        if self.echo_origin:
+            common.append((b"vary", b"Origin"))
+        else:
+            common.append((b"access-control-allow-origin", b"*"))
+
+        self.simple_headers: Headers = list(common)
+        if CORS_EXPOSE_HEADERS:
+            self.simple_headers.append((b"access-control-expose-headers", CORS_EXPOSE_HEADERS.encode()))
+
+        self.preflight_headers: Headers = common + [
+            (b"access-control-allow-methods", CORS_ALLOW_METHODS.encode()),
+            (b"access-control-max-age", str(CORS_MAX_AGE).encode()),
+            (b"content-length", b"0"),
+        ]
+        if not self.echo_request_headers:
+            self.preflight_headers.append((b"access-control-allow-headers", CORS_ALLOW_HEADERS.encode()))
+        self.options_headers: Headers = [(b"allow", CORS_ALLOW_METHODS.encode()), (b"content-length", b"0")]
+
+    def _origin_allowed(self, origin: bytes) -> bool:
+        return self.allow_all or origin.decode("latin-1") in self.origins
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        request_headers = None
+        is_preflight = False
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                is_preflight = True
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if scope["method"] == "OPTIONS":
+            await self._options(origin, is_preflight, request_headers, send)
+            return
+        if origin is None or not self._origin_allowed(origin):
+            await self.app(scope, receive, send)
+            return
+
+        extra = list(self.simple_headers)
+        if self.echo_origin:
+            extra.append((b"access-control-allow-origin", origin))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = [(k, v) for k, v in message["headers"] if not k.lower().startswith(b"access-control-")]
+                message["headers"] = headers + extra
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _options(self, origin, is_preflight: bool, request_headers, send):
+        if origin is None or not is_preflight:
+            # OPTIONS thường: chỉ báo các method được hỗ trợ
+            await self._respond(send, 204, self.options_headers)
+            return
+        if not self._origin_allowed(origin):
+            await self._respond(send, 403, [(b"content-length", b"0")])
+            return
+        headers = list(self.preflight_headers)
+        if self.echo_origin:
+            headers.append((b"access-control-allow-origin", origin))
+        if self.echo_request_headers and request_headers:
+            headers.append((b"access-control-allow-headers", request_headers))
+        await self._respond(send, 204, headers)
+
+    @staticmethod
+    async def _respond(send, status: int, headers: Headers):
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
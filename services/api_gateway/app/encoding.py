@@ -0,0 +1,68 @@
+import os
+import json
+from typing import Tuple
+from dotenv import load_dotenv
+
+try:
+    import msgpack
+except ImportError:  # msgpack là tuỳ chọn, không có thì giữ JSON giữa gateway và service
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+load_dotenv()
+
+INTERNAL_ENCODING_HEADER = "x-internal-encoding"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+# "msgpack": gateway xin cinema-service/auth-service trả msgpack (xem app/responses.py ở service).
+# Service không hỗ trợ (seatbooking) bỏ qua header và vẫn trả JSON.
+INTERNAL_ENCODING = os.getenv("GATEWAY_INTERNAL_ENCODING", "").strip().lower()
+COMPACT_ENABLED = INTERNAL_ENCODING == "msgpack" and msgpack is not None
+
+
+def add_request_header(headers: dict):
+    """Thêm header nội bộ vào request gửi upstream (chỉ với response được buffer ở gateway)"""
+    if COMPACT_ENABLED:
+        headers[INTERNAL_ENCODING_HEADER] = "msgpack"
+
+
+def is_compact(headers) -> bool:
+    return headers.get("content-type", "").startswith(MSGPACK_MEDIA_TYPE)
+
+
+def client_accepts_compact(accept: str) -> bool:
+    return MSGPACK_MEDIA_TYPE in accept
+
+
+def to_json(body: bytes) -> bytes:
+    data = msgpack.unpackb(body, raw=False)
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(body: bytes, headers) -> object:
+    """Decode body upstream trả về cho chính gateway dùng (msgpack hoặc JSON)"""
+    if is_compact(headers):
+        return msgpack.unpackb(body, raw=False)
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def to_edge(body: bytes, headers: dict, accept: str) -> Tuple[bytes, dict]:
+    """Body msgpack từ upstream: giữ nguyên nếu client chấp nhận msgpack, ngược lại
+    chuyển sang JSON. Body JSON (hoặc loại khác) đi qua nguyên vẹn."""
+    if not is_compact(headers):
+        return body, headers
+    headers = {k: v for k, v in headers.items() if k.lower() != "content-type"}
+    headers["vary"] = ", ".join(filter(None, (headers.pop("vary", ""), "Accept")))
+    if client_accepts_compact(accept):
+        headers["content-type"] = MSGPACK_MEDIA_TYPE
+        return body, headers
+    headers["content-type"] = "application/json"
+    # ETag của upstream (nếu có) ứng với body msgpack, không còn đúng cho body JSON
+    headers.pop("etag", None)
+    return to_json(body), headers
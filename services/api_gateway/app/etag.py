@@ -0,0 +1,57 @@
+import hashlib
+from starlette.responses import Response
+from app.metrics import registry, Counter
+
+NOT_MODIFIED_TOTAL = registry.register(Counter(
+    "gateway_not_modified_total", "Conditional GETs answered with 304 Not Modified", ("source",),
+))
+
+# Header giữ lại trong 304 (RFC 9110 15.4.5): client dùng chúng để cập nhật bản đã cache
+_NOT_MODIFIED_HEADERS = (
+    "etag", "cache-control", "content-location", "expires", "vary", "last-modified", "x-cache", "age",
+)
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag từ nội dung body"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def ensure_etag(headers, body: bytes) -> str:
+    """Dùng ETag upstream gửi kèm nếu có, không thì tính từ body và gắn vào headers"""
+    etag = headers.get("etag")
+    if not etag:
+        etag = compute_etag(body)
+        headers["etag"] = etag
+    return etag
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def matches(if_none_match: str, etag: str) -> bool:
+    """So sánh weak như RFC 9110 13.1.2 (If-None-Match), hỗ trợ danh sách và "*" """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = _opaque(etag)
+    return any(_opaque(tag) == target for tag in if_none_match.split(","))
+
+
+def not_modified(headers) -> Response:
+    kept = {k: v for k, v in headers.items() if k.lower() in _NOT_MODIFIED_HEADERS}
+    return Response(status_code=304, headers=kept)
+
+
+def conditional(response: Response, if_none_match: str, source: str) -> Response:
+    """Gắn ETag cho response 200 đã buffer; trả 304 không body nếu If-None-Match khớp"""
+    if response.status_code != 200:
+        return response
+    etag = ensure_etag(response.headers, response.body)
+    if not matches(if_none_match, etag):
+        return response
+    NOT_MODIFIED_TOTAL.inc(source)
+    return not_modified(response.headers)
@@ -0,0 +1,79 @@
+import io
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow là tuỳ chọn, không có thì upload không tạo variant
+    Image = None
+
+load_dotenv()
+
+# Kích thước khung (rộng, cao) của từng variant; ảnh được thu nhỏ giữ nguyên tỉ lệ
+VARIANTS = {
+    "thumbnail": (160, 240),
+    "card": (400, 600),
+    "hero": (1280, 720),
+}
+VARIANT_JPEG_QUALITY = int(os.getenv("IMAGE_VARIANT_JPEG_QUALITY", 82))
+VARIANT_WEBP_QUALITY = int(os.getenv("IMAGE_VARIANT_WEBP_QUALITY", 80))
+VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+VARIANTS_ENABLED = Image is not None and os.getenv("IMAGE_VARIANTS", "true").lower() in ("1", "true", "yes")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def render_variants(data: bytes) -> Dict[str, dict]:
+    """Resize ảnh gốc thành các variant; chạy trong process pool (CPU-bound).
+
+    Mỗi variant có bản "default" (JPEG, hoặc PNG nếu ảnh có alpha) và bản WebP:
+        {"card": {"width": 400, "height": 600,
+                  "default": (bytes, "image/jpeg"), "webp": (bytes, "image/webp")}, ...}
+    Variant không bao giờ phóng to ảnh gốc.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        source.seek(0)
+        has_alpha = source.mode in ("RGBA", "LA") or (source.mode == "P" and "transparency" in source.info)
+        base = source.convert("RGBA" if has_alpha else "RGB")
+
+    rendered = {}
+    for name, box in VARIANTS.items():
+        image = base.copy()
+        image.thumbnail(box, Image.LANCZOS)
+
+        default = io.BytesIO()
+        if has_alpha:
+            image.save(default, "PNG", optimize=True)
+            default_type = "image/png"
+        else:
+            image.save(default, "JPEG", quality=VARIANT_JPEG_QUALITY, optimize=True, progressive=True)
+            default_type = "image/jpeg"
+        webp = io.BytesIO()
+        image.save(webp, "WEBP", quality=VARIANT_WEBP_QUALITY, method=4)
+
+        rendered[name] = {
+            "width": image.width,
+            "height": image.height,
+            "default": (default.getvalue(), default_type),
+            "webp": (webp.getvalue(), "image/webp"),
+        }
+    return rendered
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn thay vì fork: process con fork từ gateway (đã có event loop, thread pool)
+        # có thể kế thừa lock đang bị thread khác giữ và treo
+        _pool = ProcessPoolExecutor(max_workers=VARIANT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,82 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable
+from dotenv import load_dotenv
+from app.metrics import register_collector
+
+load_dotenv()
+
+
+class DecodedTokenCache:
+    """Cache token đã decode: sha256(token) -> claims, hết hạn đúng tại claim `exp`.
+
+    Dependency sync của FastAPI chạy trong threadpool nên mọi thao tác đều giữ lock.
+    Mỗi worker uvicorn có cache riêng; không cần đồng bộ giữa các worker vì cùng
+    một token luôn decode ra cùng claims.
+    """
+
+    def __init__(self, max_size: int, max_ttl: float):
+        self.max_size = max_size
+        # Dùng cho token không có `exp`
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_decode(self, token: str, decode: Callable[[str], dict]) -> dict:
+        """Trả claims từ cache, nếu miss thì decode (có thể raise lỗi của jwt) rồi lưu lại"""
+        if self.max_size <= 0:
+            return decode(token)
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                claims, expires_at = entry
+                if now < expires_at:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return claims
+                del self._entries[digest]
+            self.misses += 1
+
+        # Decode ngoài lock để không chặn các thread khác
+        claims = decode(token)
+        exp = claims.get("exp")
+        expires_at = float(exp) if isinstance(exp, (int, float)) else now + self.max_ttl
+        with self._lock:
+            self._entries[digest] = (claims, expires_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return claims
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+token_cache = DecodedTokenCache(
+    max_size=int(os.getenv("JWT_CACHE_SIZE", 10000)),
+    max_ttl=float(os.getenv("JWT_CACHE_MAX_TTL", 300)),
+)
+
+register_collector(
+    "gateway_jwt_cache", "Decoded JWT cache statistics", ("stat",),
+    lambda: {(k,): v for k, v in token_cache.stats().items()},
+)
@@ -1,54 +1,73 @@
 import os
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, Depends
+from starlette.responses import PlainTextResponse
 from dotenv import load_dotenv
 import uvicorn
+from contextlib import asynccontextmanager
 
 # Import routes
-from app.routes.auth_routes import router as auth_router
-from app.routes.user_routes import router as user_router
-from app.routes.cinema_routes import router as cinema_router
-from app.routes.movie_routes import router as movie_router
-from app.routes.actor_routes import router as actor_router
-from app.routes.showtime_routes import router as showtime_router
-from app.routes.booking_routes import router as booking_router
-from app.routes.dashboard_routes import router as dashboard_router
-from app.routes.promotion_routes import router as promotion_router
-from app.routes.revenue_routes import router as revenue_router
 from app.routes.upload_routes import router as upload_router
-from app.routes.advertisement_routes import router as advertisement_router
+from app.routes.cache_routes import router as cache_router
+from app.routes.upstream_routes import router as upstream_router
+from app.routes.batch_routes import router as batch_router
+from app.routes.page_routes import router as page_router
+from app.routes.realtime_routes import router as realtime_router
+from app.routes.dispatcher import router as dispatch_router
+from app import upstreams, image_variants, access_log, revocation
+from app.metrics import MetricsMiddleware, registry
+from app.compression import CompressionMiddleware
+from app.cors import CORSMiddleware
+from app.storage import local_media_root
+from app.ratelimit import rate_limit
 # from aroutes.order_routes import router as order_router
 load_dotenv()
-app = FastAPI(title="API Gateway")
 
-# CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"], 
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Mở connection pool keep-alive cho từng upstream
+    await upstreams.startup()
+    # Thread ghi access log
+    access_log.start()
+    # Đồng bộ danh sách token đã logout từ auth-service
+    revocation.start()
+    yield
+    revocation.stop()
+    # Đóng connection pool khi gateway tắt
+    await upstreams.shutdown()
+    image_variants.shutdown()
+    access_log.stop()
+
+app = FastAPI(title="API Gateway", lifespan=lifespan)
+
+# CORS: preflight được trả lời ngay tại gateway (cấu hình qua CORS_* trong app/cors.py)
+app.add_middleware(CORSMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware, access_log=access_log.record)
 
 # Register routes
-app.include_router(auth_router, prefix="/api/v1/auth")
-app.include_router(user_router, prefix="/api/v1/users")
-app.include_router(cinema_router, prefix="/api/v1/cinemas")
-app.include_router(movie_router, prefix="/api/v1/movies")
-app.include_router(actor_router, prefix="/api/v1/actors")
-app.include_router(showtime_router, prefix="/api/v1/showtimes")
-app.include_router(booking_router,prefix="/api/v1/bookings")
-app.include_router(dashboard_router, prefix="/api/v1/dashboard")
-app.include_router(promotion_router, prefix="/api/v1/promotions")
-app.include_router(revenue_router, prefix="/api/v1/revenue")
-app.include_router(upload_router, prefix="/api/v1/upload")
-app.include_router(advertisement_router, prefix="/api/v1/advertisements")
+app.include_router(upload_router, prefix="/api/v1/upload", dependencies=[Depends(rate_limit("admin"))])
+app.include_router(cache_router, prefix="/api/v1/cache")
+app.include_router(upstream_router, prefix="/api/v1/upstreams")
+app.include_router(batch_router, prefix="/api/v1/batch")
+app.include_router(page_router, prefix="/api/v1/pages", dependencies=[Depends(rate_limit("public"))])
+# WebSocket tới seatbooking-service; JWT + rate limit được kiểm tra trong handler lúc handshake
+app.include_router(realtime_router, prefix="/api/v1/realtime")
+# UPLOAD_STORAGE=local: gateway tự phục vụ ảnh đã upload
+if local_media_root():
+    from starlette.staticfiles import StaticFiles
+    app.mount(os.getenv("LOCAL_STORAGE_BASE_URL", "/media"), StaticFiles(directory=local_media_root()), name="media")
+# Mọi route proxy còn lại: tra bảng route (app/routes/route_table.py), phải đăng ký sau cùng
+app.include_router(dispatch_router)
 
 
 @app.get("/health")
 def health():
     return {"gateway": "OK"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(registry.expose(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     port = int(os.getenv("GATEWAY_PORT", 8000))
     uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True)
\ No newline at end of file
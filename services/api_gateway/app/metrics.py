@@ -0,0 +1,234 @@
+import time
+import threading
+from contextvars import ContextVar
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Bucket (giây) cho histogram latency, giống default của prometheus_client
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {value}")
+        return lines
+
+
+class Gauge:
+    """Gauge đặt giá trị trực tiếp, hoặc lấy qua callback lúc scrape"""
+
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = (),
+                 collect: Callable[[], Dict[Tuple[str, ...], float]] = None):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.collect = collect
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def dec(self, *label_values, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} gauge"]
+        if self.collect is not None:
+            items = list(self.collect().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {value}")
+        return lines
+
+
+class Histogram:
+    """Histogram theo bucket cố định; observe chỉ là một bisect và vài phép cộng"""
+
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [count mỗi bucket (không cộng dồn) ..., +Inf, sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(values, list(series)) for values, series in self._values.items()]
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS_TOTAL = registry.register(Counter(
+    "gateway_requests_total", "Total requests handled by the gateway",
+    ("route", "method", "status", "upstream"),
+))
+REQUEST_SECONDS = registry.register(Histogram(
+    "gateway_request_duration_seconds", "Total request time in the gateway",
+    ("route", "method"),
+))
+AUTH_CHECK_SECONDS = registry.register(Histogram(
+    "gateway_auth_check_duration_seconds", "Time spent verifying JWTs",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01),
+))
+UPSTREAM_CONNECT_SECONDS = registry.register(Histogram(
+    "gateway_upstream_connect_duration_seconds", "Time to open a new upstream connection (TCP + TLS)",
+    ("upstream",),
+))
+UPSTREAM_RESPONSE_SECONDS = registry.register(Histogram(
+    "gateway_upstream_response_duration_seconds", "Time until upstream response headers are received",
+    ("upstream",),
+))
+IN_FLIGHT = registry.register(Gauge(
+    "gateway_requests_in_flight", "Requests currently being handled by the gateway",
+))
+
+
+# Thời gian theo từng phần (auth, upstream, connect) của request hiện tại, cho access log
+REQUEST_TIMINGS: ContextVar[Optional[dict]] = ContextVar("request_timings", default=None)
+
+
+def add_timing(name: str, seconds: float):
+    timings = REQUEST_TIMINGS.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def register_collector(name: str, doc: str, labels: Tuple[str, ...], collect):
+    """Gauge tính lúc scrape (cache, pool, bulkhead...) để không tốn chi phí trên hot path"""
+    return registry.register(Gauge(name, doc, labels, collect=collect))
+
+
+class MetricsMiddleware:
+    """ASGI middleware đo tổng thời gian, số request và số request đang xử lý.
+
+    Dùng ASGI thuần (không BaseHTTPMiddleware) để overhead trên mỗi request thấp.
+    Route template và upstream được đọc từ scope sau khi router xử lý xong.
+    access_log (tuỳ chọn) được gọi sau mỗi request với status, thời gian, số byte trả về
+    và thời gian từng phần (xem app/access_log.py).
+    """
+
+    def __init__(self, app, access_log: Optional[Callable] = None):
+        self.app = app
+        self.access_log = access_log
+        self._route_paths: Dict[Callable, str] = {}
+
+    def _route_template(self, scope) -> str:
+        # Dispatcher gắn template của rule trong bảng route vào request.state.route
+        route = scope.get("state", {}).get("route")
+        if route is not None:
+            return route
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            app = scope.get("app")
+            for r in getattr(app, "routes", ()):
+                if getattr(r, "endpoint", None) is endpoint:
+                    path = r.path
+                    break
+            else:
+                path = getattr(endpoint, "__name__", "unknown")
+            self._route_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        # [status, bytes trả về]
+        response = [500, 0]
+        timings = {}
+        token = REQUEST_TIMINGS.set(timings)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                response[1] += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            REQUEST_TIMINGS.reset(token)
+            elapsed = time.perf_counter() - started
+            route = self._route_template(scope)
+            method = scope["method"]
+            upstream = scope.get("state", {}).get("upstream", "")
+            REQUESTS_TOTAL.inc(route, method, str(response[0]), upstream)
+            REQUEST_SECONDS.observe(elapsed, route, method)
+            if self.access_log is not None:
+                self.access_log(scope, response[0], elapsed, route, upstream, response[1], timings)
@@ -0,0 +1,237 @@
+import os
+import math
+import ipaddress
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from fastapi import HTTPException, Request
+from dotenv import load_dotenv
+from app.metrics import registry, Counter, register_collector
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis là tuỳ chọn, không có thì chỉ limit trong process
+    aioredis = None
+
+load_dotenv()
+
+logger = logging.getLogger("gateway.ratelimit")
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Chỉ tin X-Forwarded-For / X-Real-IP khi request tới từ proxy trong các dải này (CIDR, cách nhau bởi dấu phẩy).
+# Mặc định: loopback + dải private, gồm cả docker network nơi nginx của cinema_frontend proxy /api/.
+# Đặt rỗng để luôn dùng IP của kết nối.
+RATE_LIMIT_TRUSTED_PROXIES = [
+    ipaddress.ip_network(cidr.strip(), strict=False)
+    for cidr in os.getenv(
+        "RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7"
+    ).split(",")
+    if cidr.strip()
+]
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", 16))
+# Số key tối đa mỗi shard; key lâu không dùng bị bỏ trước
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS_PER_SHARD", 10000))
+
+RATE_LIMITED_TOTAL = registry.register(Counter(
+    "gateway_rate_limited_total", "Requests rejected by the rate limiter", ("limit_class",)
+))
+
+
+class LimitClass:
+    """Một lớp rate limit: `rate` token/giây, tối đa `burst` token.
+
+    key: "ip" (theo IP client) hoặc "sub" (theo JWT subject, không có thì theo IP).
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, key: str):
+        if key not in ("ip", "sub"):
+            raise ValueError(f"Unknown rate limit key: {key}")
+        self.name = name
+        self.rate = float(os.getenv(f"RATE_LIMIT_{name.upper()}_RATE", rate))
+        self.burst = float(os.getenv(f"RATE_LIMIT_{name.upper()}_BURST", burst))
+        self.key = key
+
+
+# Login/register chạy bcrypt ở auth-service nên limit chặt nhất, theo IP (chưa có token)
+LIMIT_CLASSES: Dict[str, LimitClass] = {
+    c.name: c for c in (
+        LimitClass("auth", rate=0.2, burst=10, key="ip"),
+        LimitClass("booking", rate=2, burst=20, key="sub"),
+        LimitClass("public", rate=20, burst=100, key="ip"),
+        LimitClass("admin", rate=10, burst=50, key="sub"),
+    )
+}
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> [tokens, updated]; thứ tự LRU
+        self.buckets: "OrderedDict[str, list]" = OrderedDict()
+
+
+class ShardedTokenBucket:
+    """Token bucket trong process, chia shard theo hash(key) để giảm tranh chấp lock
+    và giới hạn bộ nhớ theo từng shard"""
+
+    def __init__(self, shards: int, max_keys_per_shard: int):
+        self._shards = [_Shard() for _ in range(shards)]
+        self.max_keys_per_shard = max_keys_per_shard
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """Lấy 1 token; trả 0 nếu được phép, ngược lại số giây phải chờ"""
+        shard = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                bucket = [burst, now]
+                shard.buckets[key] = bucket
+                if len(shard.buckets) > self.max_keys_per_shard:
+                    shard.buckets.popitem(last=False)
+            else:
+                shard.buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+    def size(self) -> int:
+        return sum(len(shard.buckets) for shard in self._shards)
+
+
+# Token bucket trong Redis: đọc, nạp, trừ trong một script nên atomic giữa các replica.
+# Dùng TIME của Redis để các gateway lệch đồng hồ vẫn chung một mốc thời gian.
+_REDIS_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RateLimiter:
+    """Kiểm tra rate limit theo lớp; dùng Redis nếu cấu hình RATE_LIMIT_REDIS_URL.
+
+    Redis lỗi thì tạm rơi về bucket trong process (limit theo từng replica) thay vì
+    chặn hoặc thả hết request.
+    """
+
+    def __init__(self, classes: Dict[str, LimitClass], redis_url: Optional[str] = None):
+        self.classes = classes
+        self.local = ShardedTokenBucket(RATE_LIMIT_SHARDS, RATE_LIMIT_MAX_KEYS)
+        self.redis = None
+        self._script = None
+        self.redis_errors = 0
+        if redis_url:
+            if aioredis is None:
+                logger.warning("RATE_LIMIT_REDIS_URL is set but redis is not installed; using in-process limits")
+            else:
+                self.redis = aioredis.from_url(redis_url)
+                self._script = self.redis.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def check(self, class_name: str, key: str) -> float:
+        """Trả 0 nếu được phép, ngược lại số giây client nên chờ"""
+        limit = self.classes[class_name]
+        bucket_key = f"{class_name}:{key}"
+        if self._script is not None:
+            try:
+                return float(await self._script(keys=[f"ratelimit:{bucket_key}"], args=[limit.rate, limit.burst]))
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning("Rate limit store unavailable, falling back to in-process limits: %s", e)
+        return self.local.take(bucket_key, limit.rate, limit.burst)
+
+    def stats(self) -> dict:
+        return {
+            "keys": self.local.size(),
+            "redis_errors": self.redis_errors,
+        }
+
+
+rate_limiter = RateLimiter(LIMIT_CLASSES, RATE_LIMIT_REDIS_URL)
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(ip in network for network in RATE_LIMIT_TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    """IP client để rate limit.
+
+    Header forwarding chỉ được đọc khi kết nối tới từ trusted proxy. X-Forwarded-For được
+    duyệt từ phải sang: mỗi proxy nối thêm IP nó nhìn thấy vào cuối, nên hop đầu tiên
+    không phải trusted proxy là client thật; phần bên trái do client tự gửi, không tin.
+    """
+    peer = request.client.host if request.client else "unknown"
+    if not _is_trusted_proxy(peer):
+        return peer
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not _is_trusted_proxy(hop):
+                return hop
+        if hops:
+            return hops[0]
+    return request.headers.get("x-real-ip", "").strip() or peer
+
+
+async def enforce(request: Request, class_name: str, subject: Optional[str] = None):
+    """Raise 429 (kèm Retry-After) nếu request vượt limit của lớp class_name"""
+    if not RATE_LIMIT_ENABLED:
+        return
+    limit = rate_limiter.classes[class_name]
+    if limit.key == "sub" and subject:
+        key = f"sub:{subject}"
+    else:
+        key = f"ip:{client_ip(request)}"
+    wait = await rate_limiter.check(class_name, key)
+    if wait > 0:
+        RATE_LIMITED_TOTAL.inc(class_name)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+
+
+def rate_limit(class_name: str):
+    """Dependency cho router không đi qua dispatcher (upload, pages...), key theo IP"""
+    if class_name not in LIMIT_CLASSES:
+        raise ValueError(f"Unknown rate limit class: {class_name}")
+
+    async def dependency(request: Request):
+        await enforce(request, class_name)
+
+    return dependency
+
+
+register_collector(
+    "gateway_rate_limiter", "Rate limiter statistics", ("stat",),
+    lambda: {(k,): v for k, v in rate_limiter.stats().items()},
+)
@@ -0,0 +1,115 @@
+import os
+import asyncio
+import httpx
+from dotenv import load_dotenv
+from starlette.websockets import WebSocket, WebSocketDisconnect
+from app.metrics import registry, Counter, Gauge
+
+try:
+    from websockets.exceptions import ConnectionClosed
+except ImportError:  # không có websockets thì không có WebSocket upstream nào để bắt lỗi
+    ConnectionClosed = ()
+
+load_dotenv()
+
+# WebSocket: kích thước message tối đa và số message upstream được đệm khi client đọc chậm
+WS_MAX_MESSAGE_SIZE = int(os.getenv("WS_MAX_MESSAGE_SIZE", 1024 * 1024))
+WS_MAX_QUEUE = int(os.getenv("WS_MAX_QUEUE", 16))
+WS_OPEN_TIMEOUT = float(os.getenv("WS_OPEN_TIMEOUT", 5))
+# SSE: upstream có thể im lặng lâu giữa hai event (heartbeat do upstream tự gửi)
+SSE_READ_TIMEOUT = float(os.getenv("SSE_READ_TIMEOUT", 300))
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+
+OPEN_CONNECTIONS = registry.register(Gauge(
+    "gateway_realtime_open_connections", "Open WebSocket/SSE connections proxied by the gateway",
+    ("kind", "upstream"),
+))
+MESSAGES_TOTAL = registry.register(Counter(
+    "gateway_realtime_messages_total", "WebSocket messages / SSE events relayed",
+    ("kind", "upstream", "direction"),
+))
+HANDSHAKE_REJECTED_TOTAL = registry.register(Counter(
+    "gateway_websocket_rejected_total", "WebSocket handshakes refused by the gateway", ("reason",),
+))
+
+# Close code chỉ dùng nội bộ (RFC 6455 7.4.1), không được gửi trong close frame
+_RESERVED_CLOSE_CODES = {1005: 1000, 1006: 1011, 1015: 1011}
+
+
+def is_event_stream(request) -> bool:
+    return request.method == "GET" and EVENT_STREAM_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def sse_timeout(timeout: httpx.Timeout) -> httpx.Timeout:
+    """Giữ connect timeout của route, nới read timeout cho stream event"""
+    return httpx.Timeout(connect=timeout.connect, read=SSE_READ_TIMEOUT, write=timeout.write, pool=timeout.pool)
+
+
+async def relay_events(resp, upstream: str):
+    """Relay SSE theo chunk, đếm connection đang mở và số event (dòng trống kết thúc event)"""
+    OPEN_CONNECTIONS.inc("sse", upstream)
+    try:
+        async for chunk in resp.aiter_raw():
+            events = chunk.count(b"\n\n")
+            if events:
+                MESSAGES_TOTAL.inc("sse", upstream, "out", amount=events)
+            yield chunk
+    finally:
+        OPEN_CONNECTIONS.dec("sse", upstream)
+        await resp.aclose()
+
+
+def _close_code(code) -> int:
+    if not code:
+        return 1000
+    return _RESERVED_CLOSE_CODES.get(code, code)
+
+
+async def _client_to_upstream(websocket: WebSocket, upstream_ws, upstream: str):
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            await upstream_ws.close(_close_code(message.get("code")))
+            return
+        data = message.get("text")
+        if data is None:
+            data = message.get("bytes", b"")
+        # send() chờ drain: upstream nhận chậm thì gateway ngừng đọc từ client
+        await upstream_ws.send(data)
+        MESSAGES_TOTAL.inc("websocket", upstream, "in")
+
+
+async def _upstream_to_client(websocket: WebSocket, upstream_ws, upstream: str):
+    try:
+        async for data in upstream_ws:
+            # Client đọc chậm -> send chờ, queue của upstream_ws đầy -> ngừng đọc socket upstream
+            if isinstance(data, str):
+                await websocket.send_text(data)
+            else:
+                await websocket.send_bytes(data)
+            MESSAGES_TOTAL.inc("websocket", upstream, "out")
+    except ConnectionClosed:
+        pass
+    await websocket.close(_close_code(upstream_ws.close_code))
+
+
+async def pump(websocket: WebSocket, upstream_ws, upstream: str):
+    """Chuyển message hai chiều tới khi một phía đóng, rồi đóng phía còn lại"""
+    OPEN_CONNECTIONS.inc("websocket", upstream)
+    tasks = [
+        asyncio.ensure_future(_client_to_upstream(websocket, upstream_ws, upstream)),
+        asyncio.ensure_future(_upstream_to_client(websocket, upstream_ws, upstream)),
+    ]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exc = task.exception()
+            if exc is not None and not isinstance(exc, (WebSocketDisconnect, ConnectionClosed)):
+                raise exc
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await upstream_ws.close()
+        OPEN_CONNECTIONS.dec("websocket", upstream)
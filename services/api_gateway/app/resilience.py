@@ -0,0 +1,111 @@
+import time
+import asyncio
+from fastapi import HTTPException
+
+# Status cho biết upstream không phục vụ được (quá tải, đang deploy, proxy phía trước lỗi).
+# 500 là lỗi ứng dụng của một endpoint, service vẫn sống nên không tính cho breaker
+UNAVAILABLE_STATUSES = frozenset({502, 503, 504})
+
+
+class UpstreamError(HTTPException):
+    """Lỗi khi gọi upstream; retryable=True nếu request chắc chắn chưa tới upstream (lỗi kết nối)"""
+
+    def __init__(self, status_code: int, detail: str, retryable: bool = False):
+        super().__init__(status_code=status_code, detail=detail)
+        self.retryable = retryable
+
+
+class CircuitBreaker:
+    """Circuit breaker đơn giản: closed -> open sau N lỗi liên tiếp -> half-open sau reset_timeout.
+
+    Ở trạng thái half-open chỉ cho một request thử; thành công thì đóng lại, lỗi thì mở tiếp.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self.total_failures = 0
+        self.rejected = 0
+
+    def before_call(self) -> bool:
+        """Trả về True nếu được gọi upstream, False nếu phải fail fast"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+        if self._trial_in_flight:
+            self.rejected += 1
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def release_trial(self):
+        """Trả lại lượt thử half-open khi request không thực sự tới upstream"""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self._trial_in_flight = False
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+
+    def record_failure(self):
+        self._trial_in_flight = False
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        retry_in = 0.0
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "total_failures": self.total_failures,
+            "rejected": self.rejected,
+            "retry_in": round(retry_in, 2),
+        }
+
+
+class Bulkhead:
+    """Giới hạn số request đồng thời tới một upstream để upstream chậm không chiếm hết gateway"""
+
+    def __init__(self, max_concurrency: int, max_wait: float):
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Upstream is busy, please retry later")
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
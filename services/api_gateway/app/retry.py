@@ -0,0 +1,171 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Optional
+import httpx
+from dotenv import load_dotenv
+from app.resilience import UpstreamError, UNAVAILABLE_STATUSES
+from app.metrics import register_collector
+
+load_dotenv()
+
+
+class RetryBudget:
+    """Ngân sách retry toàn gateway (token bucket).
+
+    Mỗi request nạp `ratio` token, mỗi retry/hedge tiêu 1 token; ngoài ra bucket được nạp
+    thêm `min_per_sec` token mỗi giây. Khi upstream sập, số retry bị giới hạn ở khoảng
+    ratio * lưu lượng nên retry không nhân tải lên upstream.
+    """
+
+    def __init__(self, ratio: float, min_per_sec: float, max_balance: float):
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.max_balance = max_balance
+        self.balance = max_balance
+        self._updated = time.monotonic()
+        self.retries = 0
+        self.hedges = 0
+        self.exhausted = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.balance = min(self.max_balance, self.balance + (now - self._updated) * self.min_per_sec)
+        self._updated = now
+
+    def deposit(self):
+        self.balance = min(self.max_balance, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self.balance < 1:
+            self.exhausted += 1
+            return False
+        self.balance -= 1
+        return True
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "balance": round(self.balance, 2),
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "exhausted": self.exhausted,
+        }
+
+
+class LatencyTracker:
+    """Giữ N latency gần nhất, tính lại p95 sau mỗi `recompute_every` mẫu"""
+
+    def __init__(self, size: int = 256, recompute_every: int = 32):
+        self._samples = deque(maxlen=size)
+        self._recompute_every = recompute_every
+        self._since_recompute = 0
+        self.p95: Optional[float] = None
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+        self._since_recompute += 1
+        if self._since_recompute >= self._recompute_every:
+            self._since_recompute = 0
+            ordered = sorted(self._samples)
+            self.p95 = ordered[int(len(ordered) * 0.95) - 1]
+
+
+class RetryPolicy:
+    """Retry policy cho GET idempotent, khai báo cạnh route trong app/routes/*.
+
+    - Retry khi lỗi kết nối hoặc upstream trả status trong retry_statuses (mặc định 502/503/504;
+      500 là lỗi ứng dụng, gửi lại chỉ nhân số lỗi),
+      tối đa max_attempts lần, backoff có jitter (full jitter).
+    - hedge=True: nếu lần gọi đầu chưa xong sau p95 latency của route thì gửi thêm
+      một request song song, lấy kết quả về trước và huỷ request còn lại.
+    Mọi retry và hedge đều phải lấy token từ retry_budget.
+    """
+
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 0.05, backoff_max: float = 1.0,
+                 retry_statuses=tuple(UNAVAILABLE_STATUSES), hedge: bool = False, hedge_min_delay: float = 0.05):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = LatencyTracker()
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge or self.latency.p95 is None:
+            return None
+        return max(self.hedge_min_delay, self.latency.p95)
+
+
+retry_budget = RetryBudget(
+    ratio=float(os.getenv("RETRY_BUDGET_RATIO", 0.1)),
+    min_per_sec=float(os.getenv("RETRY_BUDGET_MIN_PER_SEC", 3)),
+    max_balance=float(os.getenv("RETRY_BUDGET_MAX", 50)),
+)
+
+
+async def _hedged(policy: RetryPolicy, attempt: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+    delay = policy.hedge_delay()
+    if delay is None:
+        return await attempt()
+    first = asyncio.ensure_future(attempt())
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+    except BaseException:
+        first.cancel()
+        raise
+    if done or not retry_budget.withdraw():
+        return await first
+
+    retry_budget.hedges += 1
+    pending = {first, asyncio.ensure_future(attempt())}
+    last = first
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                last = task
+                if task.exception() is None and task.result().status_code not in policy.retry_statuses:
+                    return task.result()
+        # Cả hai đều lỗi: trả về (hoặc raise) kết quả của request xong sau cùng
+        return last.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call_with_retry(policy: RetryPolicy, attempt: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+    """Chạy attempt() theo retry policy; attempt phải là GET idempotent"""
+    retry_budget.deposit()
+    attempt_no = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            resp = await _hedged(policy, attempt)
+        except UpstreamError as e:
+            if not e.retryable or attempt_no + 1 >= policy.max_attempts or not retry_budget.withdraw():
+                raise
+        else:
+            policy.latency.observe(time.perf_counter() - started)
+            if (
+                resp.status_code not in policy.retry_statuses
+                or attempt_no + 1 >= policy.max_attempts
+                or not retry_budget.withdraw()
+            ):
+                return resp
+        attempt_no += 1
+        retry_budget.retries += 1
+        await asyncio.sleep(policy.backoff(attempt_no))
+
+
+register_collector(
+    "gateway_retry_budget", "Retry budget statistics", ("stat",),
+    lambda: {(k,): v for k, v in retry_budget.stats().items()},
+)
@@ -0,0 +1,148 @@
+import os
+import time
+import hashlib
+import asyncio
+import logging
+from typing import Dict, Optional
+import httpx
+from dotenv import load_dotenv
+from app import encoding
+from app.upstreams import service_url
+from app.metrics import registry, Counter, register_collector
+
+load_dotenv()
+
+logger = logging.getLogger("gateway.revocation")
+
+REVOCATION_ENABLED = os.getenv("REVOCATION_ENABLED", "true").lower() in ("1", "true", "yes")
+# Token bị logout còn dùng được tối đa chừng này giây ở gateway
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", 5))
+REVOCATION_FEED_PATH = os.getenv("REVOCATION_FEED_PATH", "/internal/revocations")
+REVOCATION_PAGE_SIZE = int(os.getenv("REVOCATION_PAGE_SIZE", 1000))
+# Mỗi lần sync đọc lại chừng này id phía sau cursor: hàng commit muộn (id nhỏ hơn cursor) không bị bỏ sót
+REVOCATION_FEED_OVERLAP = int(os.getenv("REVOCATION_FEED_OVERLAP", 100))
+# Giống INTERNAL_API_TOKEN của auth-service; không đặt thì không sync (auth-service không mở feed)
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+
+SYNC_ERRORS = registry.register(Counter(
+    "gateway_revocation_sync_errors_total", "Failed syncs of the token revocation feed",
+))
+REJECTED_TOTAL = registry.register(Counter(
+    "gateway_revoked_token_rejected_total", "Requests rejected because their token was revoked",
+))
+
+
+class RevocationSet:
+    """Token đã thu hồi (sha256 -> exp), đồng bộ dần từ feed của auth-service.
+
+    Kiểm tra trên hot path chỉ là một lần hash + tra dict, không gọi mạng. Entry bị xoá
+    khi token hết hạn vì lúc đó jwt.decode đã tự từ chối. Mỗi worker uvicorn sync riêng.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[bytes, float] = {}
+        self.cursor = 0
+        self.last_sync: Optional[float] = None
+        self.syncs = 0
+
+    def is_revoked(self, token: str) -> bool:
+        if not self._revoked:
+            return False
+        return hashlib.sha256(token.encode()).digest() in self._revoked
+
+    def apply(self, entries):
+        for token_hash, expires_at in entries:
+            self._revoked[bytes.fromhex(token_hash)] = float(expires_at)
+
+    def prune(self, now: float):
+        expired = [digest for digest, expires_at in self._revoked.items() if expires_at <= now]
+        for digest in expired:
+            del self._revoked[digest]
+
+    async def sync(self, client: httpx.AsyncClient):
+        """Kéo các lần thu hồi mới sau cursor, theo trang tới khi hết.
+
+        Trang đầu bắt đầu lùi REVOCATION_FEED_OVERLAP id; entry đọc lại chỉ ghi đè cùng key
+        trong dict nên không trùng. Cursor chỉ tăng, và mỗi trang đầy kết thúc ở id lớn hơn
+        `since` của nó nên vòng lặp luôn tiến.
+
+        client là client riêng của feed, không qua Upstream.call(): lỗi của feed nội bộ không
+        được tính vào circuit breaker / ejection của upstream auth mà route login dùng chung.
+        """
+        url = service_url("auth") + REVOCATION_FEED_PATH
+        headers = {"x-internal-token": INTERNAL_API_TOKEN}
+        encoding.add_request_header(headers)
+        since = max(0, self.cursor - REVOCATION_FEED_OVERLAP)
+        while True:
+            params = {"since": since, "limit": REVOCATION_PAGE_SIZE}
+            resp = await client.get(url, headers=headers, params=params)
+            resp.raise_for_status()
+            feed = encoding.loads(resp.content, resp.headers)
+            self.apply(feed["revoked"])
+            since = feed["cursor"]
+            self.cursor = max(self.cursor, since)
+            if not feed["more"]:
+                break
+        now = time.time()
+        self.prune(now)
+        self.last_sync = now
+        self.syncs += 1
+
+    def stats(self) -> dict:
+        return {
+            "revoked": len(self._revoked),
+            "cursor": self.cursor,
+            "syncs": self.syncs,
+            "last_sync_age": time.time() - self.last_sync if self.last_sync is not None else -1,
+        }
+
+
+revoked_tokens = RevocationSet()
+_task: Optional[asyncio.Task] = None
+
+
+async def _sync_loop():
+    # Connection pool riêng cho feed, đóng khi task bị cancel
+    async with httpx.AsyncClient(timeout=httpx.Timeout(5.0)) as client:
+        while True:
+            try:
+                await revoked_tokens.sync(client)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Giữ bản đã sync, lần sau thử lại từ cùng cursor
+                SYNC_ERRORS.inc()
+                logger.warning("Revocation feed sync failed: %s", exc)
+            await asyncio.sleep(REVOCATION_SYNC_INTERVAL)
+
+
+def start():
+    """Bật task sync feed thu hồi (gọi trong lifespan)"""
+    global _task
+    if REVOCATION_ENABLED and _task is None:
+        if not INTERNAL_API_TOKEN:
+            # auth-service không mở feed khi thiếu token: gọi cũng chỉ lỗi mỗi REVOCATION_SYNC_INTERVAL
+            logger.warning("INTERNAL_API_TOKEN is not set: token revocation sync is disabled")
+            return
+        _task = asyncio.ensure_future(_sync_loop())
+
+
+def stop():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+
+
+def check(token: str) -> bool:
+    """True nếu token đã bị thu hồi (logout)"""
+    if revoked_tokens.is_revoked(token):
+        REJECTED_TOTAL.inc()
+        return True
+    return False
+
+
+register_collector(
+    "gateway_revocation", "Token revocation set statistics", ("stat",),
+    lambda: {(k,): v for k, v in revoked_tokens.stats().items()},
+)
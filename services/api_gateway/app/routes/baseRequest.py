@@ -1,16 +1,57 @@
 from fastapi import Request, HTTPException
-from starlette.responses import Response
-import httpx
+from starlette.responses import Response, StreamingResponse
 import os
+import time
 import jwt
+import httpx
 from typing import Optional
 from dotenv import load_dotenv
-import certifi
+from app.upstreams import get_upstream, DEFAULT_TIMEOUT
+from app.cache import response_cache, is_cacheable, CACHEABLE_ROUTES
+from app.jwt_cache import token_cache
+from app.singleflight import single_flight
+from app.metrics import AUTH_CHECK_SECONDS, add_timing
+from app.etag import conditional, ensure_etag, NOT_MODIFIED_TOTAL
+from app.retry import RetryPolicy, call_with_retry
+from app import encoding, revocation
+from app.realtime import is_event_stream, relay_events, sse_timeout, EVENT_STREAM_MEDIA_TYPE
 
 
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
+# Bật chế độ streaming cho proxy (không buffer body request/response)
+PROXY_STREAMING = os.getenv("PROXY_STREAMING", "false").lower() in ("1", "true", "yes")
+# Kích thước body tối đa cho request proxy (mặc định 10MB)
+MAX_BODY_SIZE = int(os.getenv("PROXY_MAX_BODY_SIZE", 10 * 1024 * 1024))
+
+WRITE_METHODS = {"post", "put", "patch", "delete"}
+
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "trailers", "transfer-encoding", "upgrade",
+}
+
+# Header điều kiện của client, không gửi lên upstream khi kết quả được chia sẻ (cache, coalesce)
+CONDITIONAL_HEADERS = {"if-none-match", "if-modified-since"}
+
+def decode_token(token: str) -> dict:
+    """Decode JWT qua cache; lỗi (hết hạn, sai chữ ký, đã logout) được raise như jwt.decode"""
+    started = time.perf_counter()
+    try:
+        # Token đã thu hồi: tra tập sync sẵn từ auth-service (app/revocation.py), không gọi mạng
+        if revocation.check(token):
+            raise jwt.InvalidTokenError("Token has been revoked")
+        return token_cache.get_or_decode(token, _decode)
+    finally:
+        elapsed = time.perf_counter() - started
+        AUTH_CHECK_SECONDS.observe(elapsed)
+        add_timing("auth", elapsed)
+
+
+def _decode(token: str) -> dict:
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
 
 def verify_jwt(request: Request):
     auth = request.headers.get("Authorization")
@@ -21,7 +62,7 @@ def verify_jwt(request: Request):
     
     token = auth.split(" ")[1]
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return decode_token(token)
     except:  
         raise HTTPException(status_code=401, detail="Invalid token")
 
@@ -33,7 +74,7 @@ def verify_jwt_optional(request: Request):
     
     token = auth.split(" ")[1]
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return decode_token(token)
     except:
         return None
 
@@ -47,7 +88,7 @@ def verify_admin(request: Request):
     
     token = auth.split(" ")[1]
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         
         # Check if user has admin role
         role = payload.get("role")
@@ -64,42 +105,251 @@ def verify_admin(request: Request):
     except:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-async def proxy(request: Request, path: str, url_service: str, user_id: Optional[str] = None):
+def strip_hop_by_hop(headers) -> dict:
+    """Bỏ các hop-by-hop header (RFC 7230 6.1), kể cả các header được liệt kê trong Connection"""
+    connection = headers.get("connection", "")
+    drop = HOP_BY_HOP_HEADERS | {h.strip().lower() for h in connection.split(",") if h.strip()}
+    return {k: v for k, v in headers.items() if k.lower() not in drop}
+
+
+def check_content_length(request: Request):
+    """Từ chối sớm request có Content-Length vượt quá MAX_BODY_SIZE"""
+    content_length = request.headers.get("content-length")
+    if content_length is None:
+        return
+    try:
+        size = int(content_length)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    if size > MAX_BODY_SIZE:
+        raise HTTPException(status_code=413, detail="Request body too large")
+
+
+def has_body(request: Request) -> bool:
+    """Request có khai báo body (Content-Length > 0 hoặc Transfer-Encoding), GET/HEAD/DELETE thường không có"""
+    if "transfer-encoding" in request.headers:
+        return True
+    content_length = request.headers.get("content-length")
+    return content_length is not None and content_length.strip() not in ("", "0")
+
+
+async def _limited_body_stream(request: Request):
+    """Đẩy body lên upstream theo từng chunk, dừng nếu vượt MAX_BODY_SIZE (chunked upload)"""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > MAX_BODY_SIZE:
+            raise HTTPException(status_code=413, detail="Request body too large")
+        yield chunk
+
+
+async def _relay_body(resp):
+    """Relay body upstream theo chunk, luôn trả connection về pool kể cả khi client ngắt"""
+    try:
+        async for chunk in resp.aiter_raw():
+            yield chunk
+    finally:
+        await resp.aclose()
+
+
+def _buffered_headers(resp) -> dict:
+    # resp.content đã được giải nén nên bỏ Content-Encoding/Content-Length của upstream
+    response_headers = strip_hop_by_hop(resp.headers)
+    response_headers.pop("content-encoding", None)
+    response_headers.pop("content-length", None)
+    return response_headers
+
+
+def _buffered_response(resp, request: Request) -> Response:
+    """Response cho client từ response upstream đã buffer; body msgpack nội bộ được chuyển
+    sang JSON ở đây trừ khi client Accept msgpack"""
+    body, headers = encoding.to_edge(resp.content, _buffered_headers(resp), request.headers.get("accept", ""))
+    return Response(content=body, status_code=resp.status_code, headers=headers)
+
+
+def _without_conditionals(headers: dict) -> dict:
+    return {k: v for k, v in headers.items() if k.lower() not in CONDITIONAL_HEADERS}
+
+
+def _conditional_response(response: Response, request: Request) -> Response:
+    """ETag cho GET đã buffer: 304 từ upstream đi qua nguyên vẹn, 200 được gắn ETag và
+    đổi thành 304 nếu khớp If-None-Match của client"""
+    if response.status_code == 304:
+        NOT_MODIFIED_TOTAL.inc("upstream")
+        return response
+    source = "cache" if response.headers.get("x-cache") in ("HIT", "STALE") else "gateway"
+    return conditional(response, request.headers.get("if-none-match", ""), source)
+
+
+async def _event_stream(upstream, url: str, headers: dict, params: dict, timeout) -> StreamingResponse:
+    """Server-sent events: luôn stream, không qua cache/coalesce/retry, read timeout nới theo SSE_READ_TIMEOUT"""
+    def send_stream(client, extensions):
+        upstream_request = client.build_request(
+            "GET", url, headers=headers, params=params, timeout=sse_timeout(timeout), extensions=extensions
+        )
+        return client.send(upstream_request, stream=True)
+
+    resp = await upstream.call(send_stream)
+    if resp.headers.get("content-type", "").startswith(EVENT_STREAM_MEDIA_TYPE):
+        body = relay_events(resp, upstream.name)
+    else:
+        body = _relay_body(resp)
+    return StreamingResponse(body, status_code=resp.status_code, headers=strip_hop_by_hop(resp.headers))
+
+
+async def _upstream_get(upstream, url: str, headers: dict, params: dict, request: Request, coalesce: bool,
+                        timeout, retry: Optional[RetryPolicy] = None):
+    """GET tới upstream; coalesce=True thì các GET giống hệt nhau đang chạy dùng chung một lời gọi,
+    retry: retry/hedge theo policy của route"""
+    def attempt():
+        return upstream.call(lambda client, extensions: client.get(
+            url, headers=headers, params=params, timeout=timeout, extensions=extensions
+        ))
+
+    def call():
+        return call_with_retry(retry, attempt) if retry is not None else attempt()
+
+    if not coalesce:
+        return await call()
+    # Kết quả được chia sẻ giữa các client nên không được là 304 cho riêng một client
+    headers = _without_conditionals(headers)
+    key = single_flight.make_key("GET", url, request.query_params.multi_items(), headers)
+    return await single_flight.do(key, call)
+
+
+async def _cached_get(upstream, url: str, path: str, headers: dict, params: dict, request: Request,
+                      coalesce: bool, timeout, retry: Optional[RetryPolicy], etag: bool = False):
+    """GET qua edge cache: fresh -> HIT, stale -> trả bản cũ và revalidate ở background.
+    etag=True: ETag được tính một lần khi lưu entry, HIT không phải hash lại body"""
+    key = response_cache.make_key(path, request.query_params)
+    # Entry cache luôn là response 200 đầy đủ, không chuyển If-None-Match của client lên upstream
+    headers = _without_conditionals(headers)
+    entry, fresh = response_cache.get(key)
+
+    async def fetch():
+        generation = response_cache.generation
+        resp = await _upstream_get(upstream, url, headers, params, request, coalesce, timeout, retry)
+        if is_cacheable(resp.status_code, resp.headers):
+            # Cache giữ bản JSON để HIT không phải transcode lại
+            body, cached_headers = encoding.to_edge(resp.content, _buffered_headers(resp), "")
+            if etag:
+                ensure_etag(cached_headers, body)
+            response_cache.set(key, resp.status_code, cached_headers, body, generation)
+        return resp
+
+    if entry is not None:
+        if not fresh:
+            response_cache.schedule_refresh(key, fetch)
+        response = entry.to_response("HIT" if fresh else "STALE")
+        return response
+
+    resp = await fetch()
+    response = _buffered_response(resp, request)
+    response.headers["X-Cache"] = "MISS"
+    return response
+
+
+async def proxy(request: Request, path: str, url_service: str, user_id: Optional[str] = None,
+                stream: Optional[bool] = None, cache_route: Optional[str] = None, coalesce: bool = False,
+                timeout: Optional[httpx.Timeout] = None, retry: Optional[RetryPolicy] = None,
+                etag: bool = False):
+    """Proxy request tới upstream.
+
+    stream=True: body request được đẩy lên upstream khi nhận được và response được
+    trả về qua StreamingResponse, gateway không giữ toàn bộ payload trong bộ nhớ.
+    Mặc định lấy theo biến môi trường PROXY_STREAMING.
+
+    cache_route: tên route trong CACHEABLE_ROUTES. GET được phục vụ từ edge cache khi
+    admin bật cache cho route đó; POST/PUT/PATCH/DELETE thành công sẽ purge prefix của route.
+
+    coalesce=True: các GET giống hệt nhau (path, query, header liên quan tới auth) đang chạy
+    đồng thời chỉ gọi upstream một lần và chia sẻ kết quả (luôn buffer, không stream).
+
+    timeout: timeout riêng của route (khai báo cạnh route trong app/routes/*), mặc định
+    dùng DEFAULT_TIMEOUT của upstream. Mọi lời gọi đi qua bulkhead và circuit breaker của upstream.
+
+    retry: RetryPolicy của route cho GET (retry có backoff, hedging), giới hạn bởi retry budget
+    chung. GET có retry policy luôn được buffer.
+
+    GET có Accept: text/event-stream (SSE) luôn được stream, bỏ qua các tuỳ chọn trên.
+
+    etag=True: GET được buffer ở gateway thì gắn ETag (của upstream nếu có, không thì tính từ
+    body) và trả 304 không body khi khớp If-None-Match. Khi route bật edge cache, HIT được so
+    ETag tại gateway nên resource không đổi không cần gọi upstream. GET stream không hash body:
+    If-None-Match được chuyển lên upstream, ETag/304 của upstream relay nguyên vẹn.
+    """
+    if stream is None:
+        stream = PROXY_STREAMING
+    check_content_length(request)
+
     url = url_service + path
     method = request.method.lower()
-    headers = dict(request.headers)
+    headers = strip_hop_by_hop(request.headers)
     # Chỉ loại bỏ Host header nếu URL không phải localhost (để tránh vấn đề với external services)
     if not url_service.startswith("http://localhost"):
         headers.pop('host', None)
     if user_id:
         headers["x-user-id"] = user_id
-    
-    body = await request.body()
+    headers.pop(encoding.INTERNAL_ENCODING_HEADER, None)
     params = dict(request.query_params)
-    
-    # Tăng timeout lên 60 giây để tránh ReadTimeout
-    timeout = httpx.Timeout(60.0, connect=10.0)
-    
-    async with httpx.AsyncClient(timeout=timeout, verify=certifi.where()) as client:
-        resp = await client.request(
+    upstream = get_upstream(url_service)
+    request.state.upstream = upstream.name
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    if is_event_stream(request):
+        return await _event_stream(upstream, url, headers, params, timeout)
+    # Response stream được relay nguyên dạng nên chỉ xin encoding nội bộ khi gateway buffer response
+    if not stream or (method == "get" and (coalesce or retry is not None
+                                           or (cache_route and response_cache.is_enabled(cache_route, path)))):
+        encoding.add_request_header(headers)
+
+    if cache_route and method == "get" and response_cache.is_enabled(cache_route, path):
+        response = await _cached_get(upstream, url, path, headers, params, request, coalesce, timeout, retry, etag)
+        return _conditional_response(response, request) if etag else response
+
+    if (coalesce or retry is not None) and method == "get":
+        resp = await _upstream_get(upstream, url, headers, params, request, coalesce, timeout, retry)
+        response = _buffered_response(resp, request)
+        return _conditional_response(response, request) if etag else response
+
+    if stream:
+        # Không gắn body stream cho request không có body: httpx sẽ gửi chunked rỗng lên upstream
+        body_declared = has_body(request)
+
+        def send_stream(client, extensions):
+            upstream_request = client.build_request(
+                method,
+                url,
+                headers=headers,
+                params=params,
+                content=_limited_body_stream(request) if body_declared else None,
+                timeout=timeout,
+                extensions=extensions
+            )
+            return client.send(upstream_request, stream=True)
+
+        resp = await upstream.call(send_stream)
+        # Body được relay nguyên dạng (aiter_raw) nên giữ Content-Encoding/Content-Length của upstream
+        response = StreamingResponse(
+            _relay_body(resp),
+            status_code=resp.status_code,
+            headers=strip_hop_by_hop(resp.headers)
+        )
+    else:
+        body = await request.body()
+        resp = await upstream.call(lambda client, extensions: client.request(
             method,
             url,
             headers=headers,
             params=params,
-            content=body
-        )
-        print(resp)
-        # Create response with CORS headers
-        response = Response(
-            content=resp.content,
-            status_code=resp.status_code,
-            headers=resp.headers
-        )
-        
-        # Add CORS headers manually for proxied responses
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, x-user-id"
-        
-        return response
\ No newline at end of file
+            content=body,
+            timeout=timeout,
+            extensions=extensions
+        ))
+        response = _buffered_response(resp, request)
+        if etag and method == "get":
+            response = _conditional_response(response, request)
+
+    if cache_route and method in WRITE_METHODS and resp.status_code < 400:
+        response_cache.purge_prefix(CACHEABLE_ROUTES[cache_route])
+    return response
@@ -0,0 +1,102 @@
+import os
+import json
+import asyncio
+import httpx
+from fastapi import APIRouter, Request, HTTPException
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+router = APIRouter()
+
+# Giới hạn số sub-request mỗi batch và số sub-request chạy đồng thời
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+BATCH_ITEM_TIMEOUT = float(os.getenv("BATCH_ITEM_TIMEOUT", 15))
+
+# Header của request gốc được chuyển xuống từng sub-request
+FORWARDED_HEADERS = ("authorization", "accept-language", "user-agent", "x-forwarded-for")
+# Không cho batch gọi lại chính nó hoặc upload multipart
+EXCLUDED_PREFIXES = ("/api/v1/batch", "/api/v1/upload")
+
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+    query: Dict[str, Any] = Field(default_factory=dict)
+    body: Any = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+
+
+def _validate(item: BatchItem) -> Optional[str]:
+    """Lỗi của một sub-request (trả về trong kết quả của item đó), None nếu hợp lệ"""
+    method = item.method.upper()
+    if method not in ("GET", "POST", "PUT", "PATCH", "DELETE"):
+        return f"Unsupported method: {item.method}"
+    if not item.path.startswith("/api/v1/") or item.path.startswith(EXCLUDED_PREFIXES):
+        return f"Path not allowed in batch: {item.path}"
+    return None
+
+
+def _decode_body(resp: httpx.Response):
+    if not resp.content:
+        return None
+    if "application/json" in resp.headers.get("content-type", ""):
+        try:
+            return resp.json()
+        except json.JSONDecodeError:
+            pass
+    return resp.text
+
+
+@router.post("")
+@router.post("/", include_in_schema=False)
+async def batch(request: Request, data: BatchRequest):
+    """
+    Chạy nhiều sub-request trong một round trip.
+
+    Mỗi sub-request được dispatch lại qua chính gateway (in-process, không qua mạng)
+    với JWT của người gọi, nên áp dụng đúng auth rule của route tương ứng.
+    Kết quả trả về theo thứ tự, mỗi item có status riêng (item không hợp lệ -> 400 của riêng nó).
+    """
+    if not data.requests:
+        raise HTTPException(status_code=400, detail="No requests in batch")
+    if len(data.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"Too many requests in batch. Maximum is {BATCH_MAX_REQUESTS}.")
+
+    headers = {h: request.headers[h] for h in FORWARDED_HEADERS if h in request.headers}
+    # Sub-response đi trong cùng process: nén ở CompressionMiddleware rồi giải nén lại chỉ tốn CPU
+    headers["accept-encoding"] = "identity"
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    transport = httpx.ASGITransport(app=request.app, client=(request.client.host, 0) if request.client else ("127.0.0.1", 0))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway", timeout=BATCH_ITEM_TIMEOUT) as client:
+        async def run(index: int, item: BatchItem):
+            item_id = item.id if item.id is not None else str(index)
+            error = _validate(item)
+            if error:
+                return {"id": item_id, "status": 400, "body": {"detail": error}}
+            async with semaphore:
+                try:
+                    resp = await asyncio.wait_for(
+                        client.request(
+                            item.method.upper(),
+                            item.path,
+                            params=item.query,
+                            headers=headers,
+                            json=item.body,
+                        ),
+                        timeout=BATCH_ITEM_TIMEOUT,
+                    )
+                except asyncio.TimeoutError:
+                    return {"id": item_id, "status": 504, "body": {"detail": "Sub-request timed out"}}
+                except Exception as e:
+                    return {"id": item_id, "status": 502, "body": {"detail": f"Sub-request failed: {str(e)}"}}
+            return {"id": item_id, "status": resp.status_code, "body": _decode_body(resp)}
+
+        results = await asyncio.gather(*(run(i, item) for i, item in enumerate(data.requests)))
+
+    return {"results": results}
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+from app.routes.baseRequest import verify_admin
+from app.cache import response_cache, CACHEABLE_ROUTES
+from app.jwt_cache import token_cache
+from app.singleflight import single_flight
+
+router = APIRouter()
+
+
+class CacheRouteUpdate(BaseModel):
+    enabled: bool
+
+
+class CachePurgeRequest(BaseModel):
+    route: Optional[str] = None
+
+
+@router.get("/")
+async def cache_stats(payload=Depends(verify_admin)):
+    """Thống kê edge cache và danh sách route có thể bật cache (admin only)"""
+    return {"routes": CACHEABLE_ROUTES, **response_cache.stats(), "single_flight": single_flight.stats()}
+
+
+@router.put("/routes/{route}")
+async def set_route_cache(route: str, data: CacheRouteUpdate, payload=Depends(verify_admin)):
+    """Bật/tắt edge cache cho một route công khai (admin only)"""
+    if route not in CACHEABLE_ROUTES:
+        raise HTTPException(status_code=404, detail="Route is not cacheable")
+    response_cache.set_enabled(route, data.enabled)
+    return {"route": route, "enabled": response_cache.is_enabled(route)}
+
+
+@router.post("/purge")
+async def purge_cache(data: CachePurgeRequest, payload=Depends(verify_admin)):
+    """Xoá cache của một route, hoặc toàn bộ cache nếu không truyền route (admin only)"""
+    if data.route is None:
+        return {"purged": response_cache.purge_all()}
+    if data.route not in CACHEABLE_ROUTES:
+        raise HTTPException(status_code=404, detail="Route is not cacheable")
+    return {"purged": response_cache.purge_prefix(CACHEABLE_ROUTES[data.route])}
+
+
+@router.get("/jwt")
+async def jwt_cache_stats(payload=Depends(verify_admin)):
+    """Hit/miss của cache JWT đã decode trong worker hiện tại (admin only)"""
+    return token_cache.stats()
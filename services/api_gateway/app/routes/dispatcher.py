@@ -0,0 +1,148 @@
+from fastapi import APIRouter, Request, HTTPException
+from starlette.responses import RedirectResponse
+from typing import Dict, List, Optional, Tuple
+from app.routes.baseRequest import verify_jwt, verify_admin, proxy
+from app.routes.route_table import ROUTES, RouteRule
+from app.ratelimit import enforce
+
+router = APIRouter()
+
+AUTH_CHECKS = {"jwt": verify_jwt, "admin": verify_admin}
+
+
+class _Node:
+    __slots__ = ("children", "param", "param_name", "exact", "prefix", "prefix_name")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # Segment dạng {name}
+        self.param: Optional["_Node"] = None
+        self.param_name: Optional[str] = None
+        # Rule khớp chính xác tại node này / rule {path:path} bắt đầu từ node này
+        self.exact: List[RouteRule] = []
+        self.prefix: List[RouteRule] = []
+        self.prefix_name: Optional[str] = None
+
+
+class RouteTrie:
+    """Trie theo segment của path, build một lần lúc khởi động.
+
+    Lookup đi theo segment: literal trước, {param} sau, cuối cùng mới tới {path:path};
+    nên rule cụ thể nhất khớp method thắng. Chi phí O(số segment), không phụ thuộc số rule.
+    """
+
+    def __init__(self, rules: List[RouteRule]):
+        self.root = _Node()
+        for rule in rules:
+            self.add(rule)
+
+    @staticmethod
+    def _split(path: str) -> List[str]:
+        return path.lstrip("/").split("/")
+
+    def add(self, rule: RouteRule):
+        node = self.root
+        segments = self._split(rule.pattern)
+        for index, segment in enumerate(segments):
+            if segment.startswith("{") and segment.endswith(":path}"):
+                if index != len(segments) - 1:
+                    raise ValueError(f"{{...:path}} must be the last segment: {rule.pattern}")
+                node.prefix.append(rule)
+                node.prefix_name = segment[1:-len(":path}")]
+                return
+            if segment.startswith("{") and segment.endswith("}"):
+                if node.param is None:
+                    node.param = _Node()
+                    node.param_name = segment[1:-1]
+                elif node.param_name != segment[1:-1]:
+                    raise ValueError(f"Conflicting parameter names at {rule.pattern}")
+                node = node.param
+            else:
+                node = node.children.setdefault(segment, _Node())
+        node.exact.append(rule)
+
+    def match(self, path: str, method: str) -> Tuple[Optional[RouteRule], Optional[dict], bool]:
+        """Trả (rule, params, path_matched). path_matched=True nhưng rule None -> 405"""
+        segments = self._split(path)
+        params: dict = {}
+        found = self._match(self.root, segments, 0, method, params)
+        if found is not None:
+            return found, params, True
+        return None, None, self._path_matches(self.root, segments, 0)
+
+    def _match(self, node: _Node, segments: List[str], index: int, method: str, params: dict):
+        # {path:path} chỉ khớp khi còn ít nhất một segment phía sau (có thể rỗng: "/users/"),
+        # "/api/v1/users" không được rơi vào rule "/api/v1/users/{path:path}"
+        if index == len(segments):
+            for rule in node.exact:
+                if method in rule.methods:
+                    return rule
+        else:
+            segment = segments[index]
+            child = node.children.get(segment)
+            if child is not None:
+                found = self._match(child, segments, index + 1, method, params)
+                if found is not None:
+                    return found
+            if node.param is not None and segment:
+                params[node.param_name] = segment
+                found = self._match(node.param, segments, index + 1, method, params)
+                if found is not None:
+                    return found
+                del params[node.param_name]
+            for rule in node.prefix:
+                if method in rule.methods:
+                    params[node.prefix_name] = "/".join(segments[index:])
+                    return rule
+        return None
+
+    def _path_matches(self, node: _Node, segments: List[str], index: int) -> bool:
+        if index == len(segments):
+            return bool(node.exact)
+        if node.prefix:
+            return True
+        child = node.children.get(segments[index])
+        if child is not None and self._path_matches(child, segments, index + 1):
+            return True
+        return node.param is not None and bool(segments[index]) and self._path_matches(node.param, segments, index + 1)
+
+
+route_trie = RouteTrie(ROUTES)
+
+
+async def dispatch(request: Request):
+    """Một endpoint duy nhất cho mọi route proxy; rule được tra trong route_trie.
+
+    Đăng ký như Starlette route thường (không qua dependency injection của FastAPI);
+    auth check được gọi trực tiếp theo rule.
+    """
+    path = request.scope["path"]
+    rule, params, path_matched = route_trie.match(path, request.method)
+    if rule is None:
+        # Như redirect_slashes của Starlette: "/api/v1/users" -> 307 tới "/api/v1/users/"
+        if not path.endswith("/") and route_trie.match(path + "/", request.method)[2]:
+            return RedirectResponse(request.url.replace(path=path + "/"), status_code=307)
+        if path_matched:
+            raise HTTPException(status_code=405, detail="Method Not Allowed")
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Label route cho metrics (template của rule thay vì catch-all)
+    request.state.route = rule.pattern
+
+    user_id = None
+    check = AUTH_CHECKS.get(rule.auth)
+    if check is not None:
+        user_id = check(request).get("sub")
+    # Sau auth check để limit theo JWT subject; route public limit theo IP
+    await enforce(request, rule.rate_limit, str(user_id) if user_id else None)
+    return await proxy(
+        request,
+        rule.upstream_path(params),
+        rule.upstream,
+        str(user_id) if user_id else None,
+        timeout=rule.timeout,
+        **rule.proxy_options,
+    )
+
+
+router.add_route("/api/v1/{path:path}", dispatch, methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
+                 include_in_schema=False)
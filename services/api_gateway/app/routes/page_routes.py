@@ -0,0 +1,73 @@
+import os
+import asyncio
+import httpx
+from fastapi import APIRouter, Request, HTTPException
+from app.upstreams import get_upstream, service_url
+
+router = APIRouter()
+CINEMA_SERVICE = service_url("cinema")
+
+# Timeout cho từng phần của trang; phần phụ quá hạn thì trả null thay vì chặn cả trang
+MOVIE_SECTION_TIMEOUT = float(os.getenv("PAGE_MOVIE_TIMEOUT", 5))
+SECTION_TIMEOUT = float(os.getenv("PAGE_SECTION_TIMEOUT", 3))
+
+
+async def _fetch_section(path: str, params: dict, timeout: float, headers: dict):
+    """GET JSON từ cinema-service; trả (data, error)"""
+    upstream = get_upstream(CINEMA_SERVICE)
+    try:
+        resp = await asyncio.wait_for(
+            upstream.call(lambda client, extensions: client.get(
+                CINEMA_SERVICE + path, params=params, headers=headers,
+                timeout=httpx.Timeout(timeout), extensions=extensions
+            )),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
+        return None, {"status": 504, "detail": "Section timed out"}
+    except HTTPException as e:
+        return None, {"status": e.status_code, "detail": e.detail}
+    if resp.status_code >= 400:
+        return None, {"status": resp.status_code, "detail": resp.text[:200]}
+    try:
+        return resp.json(), None
+    except ValueError:
+        # 200 nhưng không phải JSON (ví dụ trang lỗi HTML của proxy): chỉ phần này lỗi
+        return None, {"status": 502, "detail": "Section returned an invalid response"}
+
+
+@router.get("/movie/{movie_id}")
+async def movie_page(request: Request, movie_id: str):
+    """
+    Dữ liệu trang chi tiết phim trong một request: phim (kèm cast), suất chiếu sắp tới,
+    banner và poster ad đang hoạt động.
+
+    Các phần được gọi song song nên độ trễ bằng lời gọi chậm nhất. Phim là bắt buộc;
+    các phần còn lại lỗi hoặc quá hạn thì trả null và ghi lý do trong "errors".
+    """
+    request.state.upstream = get_upstream(CINEMA_SERVICE).name
+    headers = {"accept-language": request.headers["accept-language"]} if "accept-language" in request.headers else {}
+    sections = {
+        "movie": (f"/api/v1/movies/{movie_id}", {}, MOVIE_SECTION_TIMEOUT),
+        "showtimes": (f"/api/v1/showtimes/movie/{movie_id}/upcoming", {}, SECTION_TIMEOUT),
+        "banners": ("/api/v1/advertisements/banners", {"active_only": "true"}, SECTION_TIMEOUT),
+        "poster_ads": ("/api/v1/advertisements/poster-ads", {"active_only": "true"}, SECTION_TIMEOUT),
+    }
+    results = await asyncio.gather(
+        *(_fetch_section(path, params, timeout, headers) for path, params, timeout in sections.values())
+    )
+
+    page = {}
+    errors = {}
+    for name, (data, error) in zip(sections, results):
+        page[name] = data
+        if error is not None:
+            errors[name] = error
+
+    movie_error = errors.get("movie")
+    if movie_error is not None:
+        status = movie_error["status"] if movie_error["status"] in (404, 503, 504) else 502
+        raise HTTPException(status_code=status, detail="Movie not found" if status == 404 else "Movie unavailable")
+
+    page["errors"] = errors
+    return page
@@ -0,0 +1,75 @@
+from urllib.parse import urlencode
+from fastapi import APIRouter, HTTPException, WebSocket
+from app.routes.baseRequest import decode_token, strip_hop_by_hop
+from app.routes.route_table import SEATBOOKING_SERVICE
+from app.upstreams import get_upstream
+from app.ratelimit import enforce
+from app.realtime import pump, HANDSHAKE_REJECTED_TOTAL, WS_OPEN_TIMEOUT, WS_MAX_MESSAGE_SIZE, WS_MAX_QUEUE
+
+router = APIRouter()
+
+# Header của handshake client, upstream handshake tự sinh lại
+_HANDSHAKE_HEADERS = {"host", "upgrade", "connection", "sec-websocket-key", "sec-websocket-version",
+                      "sec-websocket-extensions", "sec-websocket-protocol", "content-length"}
+# Danh tính do gateway đặt sau khi kiểm tra JWT; bản client tự gửi bị bỏ để không giả mạo được
+_IDENTITY_HEADERS = {"x-user-id", "x-user-role", "authorization"}
+
+
+def _token(websocket: WebSocket):
+    """Trình duyệt không đặt được header cho WebSocket nên nhận token qua query ?token=..."""
+    auth = websocket.headers.get("authorization", "")
+    if auth.startswith("Bearer "):
+        return auth.split(" ")[1]
+    return websocket.query_params.get("token")
+
+
+async def _reject(websocket: WebSocket, reason: str, code: int = 1008):
+    # Đóng trước khi accept -> client nhận HTTP 403 cho handshake
+    HANDSHAKE_REJECTED_TOTAL.inc(reason)
+    await websocket.close(code)
+
+
+@router.websocket("/{path:path}")
+async def realtime_socket(websocket: WebSocket, path: str):
+    """WebSocket tới seatbooking-service (Socket.IO: path="/api/v1/realtime/socket.io").
+
+    JWT được kiểm tra một lần lúc handshake; sau đó message được chuyển hai chiều
+    tới khi một phía đóng (app/realtime.py).
+    """
+    token = _token(websocket)
+    if not token:
+        await _reject(websocket, "token_missing")
+        return
+    try:
+        payload = decode_token(token)
+    except Exception:
+        await _reject(websocket, "invalid_token")
+        return
+    user_id = payload.get("sub")
+    try:
+        await enforce(websocket, "public", str(user_id) if user_id else None)
+    except HTTPException:
+        await _reject(websocket, "rate_limited", 1013)
+        return
+
+    headers = [(k, v) for k, v in strip_hop_by_hop(websocket.headers).items()
+               if k.lower() not in _HANDSHAKE_HEADERS and k.lower() not in _IDENTITY_HEADERS]
+    if user_id:
+        headers.append(("x-user-id", str(user_id)))
+    upstream_path = "/" + path
+    # JWT đã dùng xong ở gateway, không chuyển tiếp trong query string
+    query = [(k, v) for k, v in websocket.query_params.multi_items() if k != "token"]
+    if query:
+        upstream_path += "?" + urlencode(query)
+    upstream = get_upstream(SEATBOOKING_SERVICE)
+    subprotocols = [p.strip() for p in websocket.headers.get("sec-websocket-protocol", "").split(",") if p.strip()]
+    try:
+        upstream_ws = await upstream.connect_websocket(
+            upstream_path, headers, subprotocols, WS_OPEN_TIMEOUT, WS_MAX_MESSAGE_SIZE, WS_MAX_QUEUE,
+        )
+    except HTTPException as exc:
+        await _reject(websocket, "upstream_error", 1011 if exc.status_code >= 500 else 1008)
+        return
+
+    await websocket.accept(subprotocol=upstream_ws.subprotocol)
+    await pump(websocket, upstream_ws, upstream.name)
@@ -0,0 +1,142 @@
+"""
+Bảng route của gateway: prefix/pattern + method + mức auth -> upstream + rewrite.
+
+Cú pháp pattern giống FastAPI:
+    "/api/v1/movies/{path:path}"            prefix, phần còn lại vào {path}
+    "/api/v1/bookings/{booking_id}/checkin" khớp chính xác, {booking_id} là một segment
+    "/api/v1/users/"                        khớp chính xác
+
+Khi nhiều rule cùng khớp, rule cụ thể hơn thắng (segment literal > {param} > {path:path},
+rule sâu hơn > rule nông hơn), không phụ thuộc thứ tự khai báo.
+
+auth: "public" (không cần token), "jwt" (verify_jwt), "admin" (verify_admin).
+rate_limit: lớp rate limit trong app/ratelimit.py; mặc định "admin" cho route admin,
+"public" cho route còn lại.
+"""
+import httpx
+from typing import Iterable, Optional
+from app.retry import RetryPolicy
+from app.ratelimit import LIMIT_CLASSES
+from app.upstreams import service_url
+
+AUTH_SERVICE = service_url("auth")
+CINEMA_SERVICE = service_url("cinema")
+SEATBOOKING_SERVICE = service_url("seatbooking")
+
+READ = ("GET",)
+WRITE = ("POST", "PUT", "DELETE", "PATCH")
+ALL = READ + WRITE
+
+# Timeout theo route: đọc catalog công khai phải nhanh, thao tác ghi được chờ lâu hơn
+PUBLIC_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+ADMIN_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+# Thống kê, báo cáo doanh thu chạy lâu hơn các route khác
+REPORT_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+# Login/register chạy bcrypt ở auth-service; gửi email OTP qua seatbooking-service chậm hơn
+AUTH_TIMEOUT = httpx.Timeout(15.0, connect=3.0)
+EMAIL_TIMEOUT = httpx.Timeout(30.0, connect=3.0)
+USER_TIMEOUT = httpx.Timeout(15.0, connect=3.0)
+BOOKING_TIMEOUT = httpx.Timeout(20.0, connect=3.0)
+PROMOTION_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+# Socket.IO long-polling giữ request tới pingInterval + pingTimeout (25s + 20s)
+REALTIME_TIMEOUT = httpx.Timeout(60.0, connect=3.0)
+
+def public_retry() -> RetryPolicy:
+    """GET công khai là idempotent: retry lỗi kết nối/502-504 và hedge khi chậm hơn p95.
+    Mỗi route một instance để p95 (ngưỡng hedge) đo theo latency của riêng route đó."""
+    return RetryPolicy(max_attempts=3, hedge=True)
+
+
+class RouteRule:
+    def __init__(self, pattern: str, methods: Iterable[str], auth: str, upstream: str, rewrite: str,
+                 timeout: Optional[httpx.Timeout] = None, rate_limit: Optional[str] = None, **proxy_options):
+        if auth not in ("public", "jwt", "admin"):
+            raise ValueError(f"Unknown auth level: {auth}")
+        rate_limit = rate_limit or ("admin" if auth == "admin" else "public")
+        if rate_limit not in LIMIT_CLASSES:
+            raise ValueError(f"Unknown rate limit class: {rate_limit}")
+        self.pattern = pattern
+        self.methods = frozenset(m.upper() for m in methods)
+        self.auth = auth
+        self.upstream = upstream
+        self.rewrite = rewrite
+        self.timeout = timeout
+        self.rate_limit = rate_limit
+        # stream, cache_route, coalesce, retry... truyền thẳng vào proxy()
+        self.proxy_options = proxy_options
+
+    def upstream_path(self, params: dict) -> str:
+        return self.rewrite.format(**params)
+
+    def __repr__(self):
+        return f"RouteRule({self.pattern!r}, {sorted(self.methods)}, auth={self.auth!r})"
+
+
+def _catalog(resource: str, write_auth: str = "admin", **read_options):
+    """Catalog ở cinema-service: GET công khai (có ETag/304), ghi cần quyền (mặc định admin)"""
+    pattern = f"/api/v1/{resource}/{{path:path}}"
+    rewrite = f"/api/v1/{resource}/{{path}}"
+    cache_route = read_options.pop("cache_route", None)
+    return [
+        RouteRule(pattern, READ, "public", CINEMA_SERVICE, rewrite, PUBLIC_TIMEOUT,
+                  cache_route=cache_route, etag=True, **read_options),
+        RouteRule(pattern, WRITE, write_auth, CINEMA_SERVICE, rewrite, ADMIN_TIMEOUT, cache_route=cache_route),
+    ]
+
+
+ROUTES = [
+    # Auth: endpoint email/OTP nằm ở seatbooking-service, còn lại ở auth-service
+    RouteRule("/api/v1/auth/{path:path}", ALL, "public", AUTH_SERVICE, "/api/v1/auth/{path}", AUTH_TIMEOUT),
+    # Mỗi login/register tốn một lần bcrypt -> limit chặt theo IP để chặn credential stuffing
+    *[
+        RouteRule(f"/api/v1/auth/{name}", ("POST",), "public", AUTH_SERVICE, f"/api/v1/auth/{name}", AUTH_TIMEOUT,
+                  rate_limit="auth")
+        for name in ("login", "register")
+    ],
+    *[
+        RouteRule(f"/api/v1/auth/{name}", ALL, "public", SEATBOOKING_SERVICE, f"/{name}", EMAIL_TIMEOUT,
+                  rate_limit="auth")
+        for name in ("send-otp-email", "verify-otp", "forgot-password", "reset-password-otp")
+    ],
+
+    # Users
+    RouteRule("/api/v1/users/", READ, "admin", AUTH_SERVICE, "/api/v1/users/", USER_TIMEOUT),
+    RouteRule("/api/v1/users/{path:path}", ALL, "jwt", AUTH_SERVICE, "/api/v1/users/{path}", USER_TIMEOUT),
+
+    # Catalog công khai
+    # Danh sách rạp kèm phòng và ghế rất lớn -> stream thẳng về client
+    *_catalog("cinemas", stream=True, cache_route="cinemas"),
+    *_catalog("movies", write_auth="jwt", cache_route="movies", retry=public_retry()),
+    *_catalog("actors", retry=public_retry()),
+    # Lúc mở bán, rất nhiều client cùng gọi upcoming/seats của một suất -> gộp request giống nhau
+    *_catalog("showtimes", cache_route="showtimes", coalesce=True, retry=public_retry()),
+    *_catalog("advertisements", cache_route="advertisements", retry=public_retry()),
+
+    # Realtime ghế (Socket.IO ở seatbooking-service). Upgrade WebSocket cùng path được xử lý
+    # ở app/routes/realtime_routes.py; đây là transport long-polling, cần header Authorization
+    RouteRule("/api/v1/realtime/{path:path}", ("GET", "POST"), "jwt", SEATBOOKING_SERVICE, "/{path}",
+              REALTIME_TIMEOUT, rate_limit="booking", stream=True),
+
+    # Bookings (seatbooking-service)
+    RouteRule("/api/v1/bookings/{path:path}", ("GET", "POST", "PUT", "DELETE"), "jwt",
+              SEATBOOKING_SERVICE, "/{path}", BOOKING_TIMEOUT, rate_limit="booking"),
+    RouteRule("/api/v1/bookings/tickets", READ, "admin", SEATBOOKING_SERVICE, "/tickets", BOOKING_TIMEOUT),
+    RouteRule("/api/v1/bookings/{booking_id}/checkin", ("POST",), "admin", SEATBOOKING_SERVICE,
+              "/{booking_id}/checkin", BOOKING_TIMEOUT),
+    RouteRule("/api/v1/bookings/seats/checkin", ("POST",), "admin", SEATBOOKING_SERVICE,
+              "/seats/checkin", BOOKING_TIMEOUT),
+
+    # Promotions (seatbooking-service)
+    RouteRule("/api/v1/promotions/active", READ, "public", SEATBOOKING_SERVICE, "/promotions/active", PROMOTION_TIMEOUT),
+    RouteRule("/api/v1/promotions/validate", ("POST",), "jwt", SEATBOOKING_SERVICE, "/promotions/validate",
+              PROMOTION_TIMEOUT, rate_limit="booking"),
+    RouteRule("/api/v1/promotions/", ("GET", "POST"), "admin", SEATBOOKING_SERVICE, "/promotions", PROMOTION_TIMEOUT),
+    RouteRule("/api/v1/promotions/{promotion_id}", ("GET", "PUT", "DELETE"), "admin", SEATBOOKING_SERVICE,
+              "/promotions/{promotion_id}", PROMOTION_TIMEOUT),
+
+    # Admin
+    RouteRule("/api/v1/dashboard/{path:path}", READ, "admin", CINEMA_SERVICE, "/api/v1/dashboard/{path}",
+              REPORT_TIMEOUT),
+    RouteRule("/api/v1/revenue/{path:path}", ALL, "admin", CINEMA_SERVICE, "/api/v1/revenue/{path}",
+              REPORT_TIMEOUT),
+]
@@ -1,65 +1,106 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Request
-import cloudinary
-import cloudinary.uploader
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Configure Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET")
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.datastructures import UploadFile
+from app.storage import (
+    MAX_UPLOAD_SIZE, ALLOWED_TYPES, StorageError, store_file, store_url,
 )
+from app.upload_jobs import upload_jobs, UPLOAD_BATCH_MAX_ITEMS
+from app.routes.baseRequest import verify_admin
 
-router = APIRouter()
+# Chỉ admin được upload (trang admin gửi Bearer token); upload-url còn tải ảnh từ URL bất kỳ
+router = APIRouter(dependencies=[Depends(verify_admin)])
 
-@router.post("/")
-async def upload_image(file: UploadFile = File(...)):
-    """
-    Upload image to Cloudinary and return the URL
+# Phần overhead của multipart (boundary, header của từng part) cho phép ngoài kích thước ảnh
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _limited_receive(receive, limit: int):
+    """Bọc ASGI receive: đếm byte body khi đang nhận, vượt limit thì dừng ngay (413)"""
+    received = 0
+
+    async def wrapper():
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > limit:
+                raise HTTPException(status_code=413, detail="File too large. Maximum size is 5MB.")
+        return message
+
+    return wrapper
+
+
+async def _read_form(request: Request, limit: int, max_files: int = 1000):
+    """Đọc multipart theo stream.
+
+    Starlette ghi từng chunk của file vào SpooledTemporaryFile (lớn thì tràn ra đĩa),
+    nên ảnh không nằm trọn trong RAM; body bị cắt ngay khi vượt giới hạn thay vì đọc hết.
     """
-    try:
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail="File too large. Maximum size is 5MB.")
 
-        allowed_types = ["image/jpeg", "image/png", "image/gif", "image/webp"]
-        if file.content_type not in allowed_types:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid file type. Only JPEG, PNG, GIF, and WebP are allowed."
-            )
+    limited = Request(request.scope, receive=_limited_receive(request.receive, limit))
+    return await limited.form(max_files=max_files)
 
-        
-        file_content = await file.read()
-        if len(file_content) > 5 * 1024 * 1024:  # 5MB
-            raise HTTPException(
-                status_code=400,
-                detail="File too large. Maximum size is 5MB."
-            )
 
-        # Upload to Cloudinary
-        result = cloudinary.uploader.upload(
-            file_content,
-            folder="cinema_app",  
-            resource_type="image"
+def _check_image(file: UploadFile):
+    if file.content_type not in ALLOWED_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid file type. Only JPEG, PNG, GIF, and WebP are allowed."
         )
 
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail="File too large. Maximum size is 5MB."
+        )
+
+
+async def _read_upload(request: Request) -> UploadFile:
+    form = await _read_form(request, MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD, max_files=1)
+    file = form.get("file")
+    if not isinstance(file, UploadFile):
+        raise HTTPException(status_code=422, detail="Field 'file' is required")
+    return file
+
+
+@router.post("/")
+async def upload_image(request: Request):
+    """
+    Upload image to the configured storage backend and return the URL
+    """
+    file = await _read_upload(request)
+    try:
+        _check_image(file)
+
+        # Hash + upload chạy trên upload worker pool, render variant trên process pool.
+        # Ảnh trùng nội dung với ảnh đã upload thì trả luôn URL cũ.
+        result = await store_file(file.file, file.filename, file.content_type)
+
         return {
             "success": True,
             "url": result["secure_url"],
             "public_id": result["public_id"],
-            "message": "Image uploaded successfully"
+            "duplicate": result["duplicate"],
+            "variants": result["variants"],
+            "message": "Image already uploaded" if result["duplicate"] else "Image uploaded successfully"
         }
 
-    except cloudinary.exceptions.Error as e:
-        raise HTTPException(status_code=500, detail=f"Cloudinary error: {str(e)}")
+    except HTTPException:
+        raise
+    except StorageError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    finally:
+        await file.close()
 
 @router.post("/upload-url")
 async def upload_from_url(request: Request):
     """
-    Upload image from URL to Cloudinary and return the URL
+    Upload image from URL to the configured storage backend and return the URL
     """
     try:
         # Accept image_url from JSON body, form data, or query param for compatibility
@@ -85,21 +126,94 @@ async def upload_from_url(request: Request):
                 detail="Invalid URL. Must be provided as JSON body, form field, or query param and be a valid HTTP/HTTPS URL."
             )
 
-        # Upload to Cloudinary from URL
-        result = cloudinary.uploader.upload(
-            image_url,
-            folder="cinema_app",  # Optional: organize images in a folder
-            resource_type="image"
-        )
+        # Gateway tự tải ảnh (vừa tải vừa hash) để dedup trước khi upload
+        result = await store_url(image_url)
 
         return {
             "success": True,
             "url": result["secure_url"],
             "public_id": result["public_id"],
-            "message": "Image uploaded successfully from URL"
+            "duplicate": result["duplicate"],
+            "variants": result["variants"],
+            "message": "Image already uploaded" if result["duplicate"] else "Image uploaded successfully from URL"
         }
 
-    except cloudinary.exceptions.Error as e:
-        raise HTTPException(status_code=500, detail=f"Cloudinary error: {str(e)}")
+    except HTTPException:
+        raise
+    except StorageError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+
+def _file_worker(file: UploadFile):
+    async def run():
+        try:
+            _check_image(file)
+            result = await store_file(file.file, file.filename, file.content_type)
+        finally:
+            await file.close()
+        return {"url": result["secure_url"], "public_id": result["public_id"], "duplicate": result["duplicate"],
+                "variants": result["variants"]}
+    return run
+
+
+def _url_worker(image_url: str):
+    async def run():
+        if not image_url.startswith(('http://', 'https://')):
+            raise HTTPException(status_code=400, detail="Invalid URL. Must be a valid HTTP/HTTPS URL.")
+        result = await store_url(image_url)
+        return {"url": result["secure_url"], "public_id": result["public_id"], "duplicate": result["duplicate"],
+                "variants": result["variants"]}
+    return run
+
+
+@router.post("/batch")
+async def upload_batch(request: Request):
+    """
+    Upload many images (multipart field `files` and/or `image_urls`, or JSON {"image_urls": [...]}).
+
+    Returns 202 with a job id right away; items are processed in the background with a
+    parallelism cap. Poll GET /batch/{job_id} for per-item results.
+    """
+    files = []
+    image_urls = []
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        limit = UPLOAD_BATCH_MAX_ITEMS * (MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD)
+        form = await _read_form(request, limit, max_files=UPLOAD_BATCH_MAX_ITEMS)
+        files = [f for f in form.getlist("files") if isinstance(f, UploadFile)]
+        image_urls = [u for u in form.getlist("image_urls") if isinstance(u, str)]
+    else:
+        try:
+            body = await request.json()
+        except Exception:
+            raise HTTPException(status_code=400, detail="Body must be multipart form data or JSON")
+        if isinstance(body, dict) and isinstance(body.get("image_urls"), list):
+            image_urls = [u for u in body["image_urls"] if isinstance(u, str)]
+
+    total = len(files) + len(image_urls)
+    if total == 0 or total > UPLOAD_BATCH_MAX_ITEMS:
+        for file in files:
+            await file.close()
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch must contain between 1 and {UPLOAD_BATCH_MAX_ITEMS} files or image_urls"
+        )
+
+    job = upload_jobs.create([f.filename or "file" for f in files] + image_urls)
+    job.start([_file_worker(f) for f in files] + [_url_worker(u) for u in image_urls])
+    return JSONResponse(
+        status_code=202,
+        content={**job.to_dict(), "status_url": f"{request.url.path.rstrip('/')}/{job.id}"},
+    )
+
+
+@router.get("/batch/{job_id}")
+async def upload_batch_status(job_id: str):
+    """
+    Per-item status of a batch upload job
+    """
+    job = upload_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job.to_dict()
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+from app.routes.baseRequest import verify_admin
+from app.upstreams import upstream_stats
+
+router = APIRouter()
+
+
+@router.get("/")
+async def list_upstreams(payload=Depends(verify_admin)):
+    """Trạng thái circuit breaker và bulkhead của từng upstream (admin only)"""
+    return {"upstreams": upstream_stats()}
@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, Tuple
+from app.metrics import register_collector
+
+# Header ảnh hưởng tới nội dung response; request khác nhau ở các header này không gộp chung
+COALESCE_HEADERS = ("authorization", "x-user-id", "accept", "accept-language")
+
+
+class SingleFlight:
+    """Gộp các lời gọi upstream giống hệt nhau đang chạy đồng thời thành một.
+
+    Lời gọi chạy trong task riêng nên nếu client đầu tiên ngắt kết nối thì các
+    client đang chờ vẫn nhận được kết quả.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    @staticmethod
+    def make_key(method: str, url: str, query_items: Iterable[Tuple[str, str]], headers: dict) -> Tuple:
+        return (
+            method.upper(),
+            url,
+            tuple(sorted(query_items)),
+            tuple(headers.get(h, "") for h in COALESCE_HEADERS),
+        )
+
+    async def do(self, key: Tuple, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            self.leaders += 1
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._done(key, f))
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+    def _done(self, key: Tuple, future: asyncio.Future):
+        self._inflight.pop(key, None)
+        # Đánh dấu exception đã được lấy, tránh warning khi mọi client chờ đã huỷ
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> dict:
+        return {"inflight": len(self._inflight), "leaders": self.leaders, "shared": self.shared}
+
+
+single_flight = SingleFlight()
+
+register_collector(
+    "gateway_single_flight", "Coalesced upstream GET statistics", ("stat",),
+    lambda: {(k,): v for k, v in single_flight.stats().items()},
+)
@@ -0,0 +1,344 @@
+import io
+import os
+import uuid
+import hashlib
+import tempfile
+import shutil
+import socket
+import asyncio
+import ipaddress
+import mimetypes
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+import httpx
+from dotenv import load_dotenv
+from app.upload_index import upload_index
+from app import image_variants
+
+load_dotenv()
+
+# Kích thước ảnh tối đa (mặc định 5MB) và số upload chạy song song tới storage
+MAX_UPLOAD_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", 5 * 1024 * 1024))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", 4))
+UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "cinema_app")
+# Upload từ URL: số redirect tối đa (mỗi bước đều kiểm tra lại host) và thời gian nhớ URL nguồn
+FETCH_MAX_REDIRECTS = int(os.getenv("UPLOAD_FETCH_MAX_REDIRECTS", 3))
+UPLOAD_SOURCE_TTL = float(os.getenv("UPLOAD_SOURCE_TTL", 24 * 3600))
+
+ALLOWED_TYPES = ["image/jpeg", "image/png", "image/gif", "image/webp"]
+
+CHUNK_SIZE = 64 * 1024
+# Ảnh nhỏ hơn ngưỡng này nằm trong RAM, lớn hơn thì spool ra đĩa
+SPOOL_SIZE = 1024 * 1024
+
+
+class StorageError(Exception):
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StorageBackend(ABC):
+    """Nơi lưu ảnh upload. Method là blocking, được gọi qua run_in_pool()."""
+
+    name = "base"
+
+    @abstractmethod
+    def upload_file(self, fileobj: BinaryIO, filename: str, content_type: str,
+                    public_id: Optional[str] = None) -> dict:
+        """Lưu file, trả về {"secure_url": ..., "public_id": ...}.
+
+        public_id (gồm cả folder) cho trước thì dùng làm key, không thì backend tự sinh.
+        """
+
+
+class CloudinaryStorage(StorageBackend):
+    name = "cloudinary"
+
+    def __init__(self, folder: str):
+        import cloudinary
+        import cloudinary.uploader
+
+        cloudinary.config(
+            cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+            api_key=os.getenv("CLOUDINARY_API_KEY"),
+            api_secret=os.getenv("CLOUDINARY_API_SECRET")
+        )
+        self._uploader = cloudinary.uploader
+        self._error = cloudinary.exceptions.Error
+        self.folder = folder
+
+    def upload_file(self, fileobj: BinaryIO, filename: str, content_type: str,
+                    public_id: Optional[str] = None) -> dict:
+        # public_id đã có folder ở đầu nên không truyền folder nữa
+        options = {"public_id": public_id} if public_id else {"folder": self.folder}
+        try:
+            result = self._uploader.upload(fileobj, resource_type="image", **options)
+        except self._error as e:
+            raise StorageError(f"Cloudinary error: {str(e)}")
+        return {"secure_url": result["secure_url"], "public_id": result["public_id"]}
+
+
+class LocalStorage(StorageBackend):
+    """Lưu ảnh vào thư mục local, phục vụ qua base_url (dùng cho dev và test)"""
+
+    name = "local"
+
+    def __init__(self, root: str, base_url: str, folder: str):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        self.folder = folder
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+
+    def upload_file(self, fileobj: BinaryIO, filename: str, content_type: str,
+                    public_id: Optional[str] = None) -> dict:
+        extension = mimetypes.guess_extension(content_type or "") or ""
+        public_id = public_id or f"{self.folder}/{uuid.uuid4().hex}"
+        with open(os.path.join(self.root, public_id + extension), "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+        return {"secure_url": f"{self.base_url}/{public_id}{extension}", "public_id": public_id}
+
+
+def _build_storage() -> StorageBackend:
+    backend = os.getenv("UPLOAD_STORAGE", "cloudinary").lower()
+    if backend == "local":
+        return LocalStorage(
+            root=os.getenv("LOCAL_STORAGE_ROOT", "./media"),
+            base_url=os.getenv("LOCAL_STORAGE_BASE_URL", "/media"),
+            folder=UPLOAD_FOLDER,
+        )
+    return CloudinaryStorage(folder=UPLOAD_FOLDER)
+
+
+storage: StorageBackend = _build_storage()
+
+# Pool riêng cho storage: upload chậm chỉ chiếm worker của pool này, không chặn event loop
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+
+async def run_in_pool(fn, *args):
+    """Chạy hàm blocking của storage trên upload worker pool"""
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+def set_storage(backend: StorageBackend):
+    """Đổi storage backend (ví dụ LocalStorage khi test)"""
+    global storage
+    storage = backend
+
+
+def get_storage() -> StorageBackend:
+    return storage
+
+
+def local_media_root() -> Optional[str]:
+    return storage.root if isinstance(storage, LocalStorage) else None
+
+
+def _hash_file(fileobj: BinaryIO) -> str:
+    """SHA-256 của file (đọc theo chunk), sau đó tua lại đầu file"""
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+# Chữ ký đầu file của các định dạng cho phép (WebP: "RIFF" + 4 byte size + "WEBP")
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_image_type(fileobj: BinaryIO) -> Optional[str]:
+    """Đoán định dạng ảnh từ magic bytes (không tin content-type client gửi), tua lại đầu file"""
+    fileobj.seek(0)
+    head = fileobj.read(12)
+    fileobj.seek(0)
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def _check_fetch_url(url: str) -> str:
+    """Chặn SSRF: chỉ cho http/https tới host mà mọi địa chỉ resolve ra đều là public.
+
+    Địa chỉ private, loopback, link-local (metadata của cloud), reserved, multicast đều bị từ chối.
+    Trả địa chỉ đã kiểm tra để kết nối thẳng tới đó (không resolve lại).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise StorageError("Invalid image URL", 400)
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        addresses = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise StorageError("Could not fetch image", 400)
+    for address in addresses:
+        ip = ipaddress.ip_address(address[4][0].split("%")[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise StorageError("Image URL must point to a public host", 400)
+    return addresses[0][4][0].split("%")[0]
+
+
+def _pinned_request(client: httpx.Client, url: str) -> httpx.Request:
+    """GET tới đúng IP vừa kiểm tra, Host header và SNI (kiểm tra chứng chỉ) vẫn theo hostname gốc.
+
+    httpx tự resolve lại hostname thì DNS rebinding có thể trả về IP nội bộ sau khi đã qua kiểm tra.
+    """
+    parts = urlsplit(url)
+    address = _check_fetch_url(url)
+    # Hostname dạng ASCII (IDNA) cho Host header và SNI
+    hostname = httpx.URL(url).raw_host.decode("ascii")
+    host = f"[{hostname}]" if ":" in hostname else hostname
+    pinned = f"[{address}]" if ":" in address else address
+    port = f":{parts.port}" if parts.port else ""
+    # Bỏ user:password trong URL, không gửi credential tới host ngoài
+    target = urlunsplit((parts.scheme, pinned + port, parts.path or "/", parts.query, ""))
+    return client.build_request(
+        "GET", target, headers={"Host": host + port}, extensions={"sni_hostname": hostname},
+    )
+
+
+def _read_image(resp: httpx.Response) -> Tuple[BinaryIO, str, str]:
+    # Không đưa status của upstream vào message trả cho client
+    if resp.status_code >= 400:
+        raise StorageError("Could not fetch image", 400)
+    content_type = resp.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in ALLOWED_TYPES:
+        raise StorageError("URL does not point to a JPEG, PNG, GIF or WebP image", 400)
+    tmp = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        for chunk in resp.iter_bytes(CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_UPLOAD_SIZE:
+                raise StorageError("File too large. Maximum size is 5MB.", 400)
+            digest.update(chunk)
+            tmp.write(chunk)
+    except BaseException:
+        tmp.close()
+        raise
+    tmp.seek(0)
+    return tmp, content_type, digest.hexdigest()
+
+
+def fetch_image(url: str) -> Tuple[BinaryIO, str, str]:
+    """Tải ảnh từ URL theo stream: vừa ghi vào spooled temp file vừa tính SHA-256.
+
+    Mỗi bước kết nối tới IP đã kiểm tra (_pinned_request); redirect được tự đi theo
+    (tối đa FETCH_MAX_REDIRECTS) để kiểm tra và ghim lại host ở từng bước.
+    Trả (file, content_type, sha256); người gọi phải đóng file.
+    """
+    try:
+        with httpx.Client(timeout=30.0, follow_redirects=False) as client:
+            for _ in range(FETCH_MAX_REDIRECTS + 1):
+                resp = client.send(_pinned_request(client, url), stream=True)
+                try:
+                    if not resp.is_redirect:
+                        return _read_image(resp)
+                    # Location tương đối được ghép với URL gốc (không phải URL theo IP)
+                    url = str(httpx.URL(url).join(resp.headers["location"]))
+                finally:
+                    resp.close()
+    except (httpx.HTTPError, httpx.InvalidURL):
+        raise StorageError("Could not fetch image", 400)
+    raise StorageError("Could not fetch image: too many redirects", 400)
+
+
+def _read_all(fileobj: BinaryIO) -> bytes:
+    fileobj.seek(0)
+    data = fileobj.read()
+    fileobj.seek(0)
+    return data
+
+
+def _upload_variants(rendered: dict, public_id: str) -> dict:
+    # Key của variant đi theo key ảnh gốc: <public_id>-card, <public_id>-card-webp, ...
+    backend = get_storage()
+    variants = {}
+    for name, variant in rendered.items():
+        urls = {}
+        for encoding in ("default", "webp"):
+            body, content_type = variant[encoding]
+            key = f"{public_id}-{name}" if encoding == "default" else f"{public_id}-{name}-{encoding}"
+            result = backend.upload_file(io.BytesIO(body), key.rsplit("/", 1)[-1], content_type, public_id=key)
+            urls["url" if encoding == "default" else encoding] = result["secure_url"]
+        variants[name] = {**urls, "width": variant["width"], "height": variant["height"]}
+    return variants
+
+
+async def build_variants(fileobj: BinaryIO, public_id: str) -> Optional[dict]:
+    """Tạo thumbnail/card/hero (+ WebP) trong process pool rồi lưu cạnh ảnh gốc.
+
+    Event loop chỉ await kết quả của process pool, không thread nào bị chặn chờ render.
+    Trả map {"card": {"url": ..., "webp": ..., "width": ..., "height": ...}, ...};
+    None nếu không có Pillow hoặc ảnh không đọc được (ảnh gốc vẫn được lưu).
+    """
+    if not image_variants.VARIANTS_ENABLED:
+        return None
+    data = await run_in_pool(_read_all, fileobj)
+    try:
+        rendered = await asyncio.wrap_future(
+            image_variants.get_pool().submit(image_variants.render_variants, data)
+        )
+    except Exception:
+        return None
+    return await run_in_pool(_upload_variants, rendered, public_id)
+
+
+async def store_file(fileobj: BinaryIO, filename: str, content_type: str, sha256: Optional[str] = None,
+                     source_url: Optional[str] = None) -> dict:
+    """Upload có dedup: ảnh trùng nội dung (SHA-256) trả URL đã có, không upload lại.
+
+    Hash, index và upload chạy trên upload worker pool; nội dung phải đúng là ảnh
+    JPEG/PNG/GIF/WebP (theo magic bytes) thì mới tới storage hay Pillow, và được lưu
+    theo định dạng thật thay vì content_type khai báo.
+    """
+    backend = get_storage()
+    detected = await run_in_pool(sniff_image_type, fileobj)
+    if detected is None:
+        raise StorageError("File content is not a JPEG, PNG, GIF or WebP image", 415)
+    if sha256 is None:
+        sha256 = await run_in_pool(_hash_file, fileobj)
+    existing = await run_in_pool(upload_index.get, sha256, backend.name)
+    if existing is not None:
+        if source_url:
+            await run_in_pool(upload_index.remember_source, source_url, sha256)
+        if existing["variants"] is None:
+            # Ảnh upload trước khi bật variant: tạo bù
+            existing["variants"] = await build_variants(fileobj, existing["public_id"])
+            if existing["variants"] is not None:
+                await run_in_pool(upload_index.set_variants, sha256, backend.name, existing["variants"])
+        return {**existing, "sha256": sha256, "duplicate": True}
+    result = await run_in_pool(backend.upload_file, fileobj, filename, detected)
+    result["variants"] = await build_variants(fileobj, result["public_id"])
+    await run_in_pool(upload_index.put, sha256, backend.name, result, source_url)
+    return {**result, "sha256": sha256, "duplicate": False}
+
+
+async def store_url(url: str) -> dict:
+    """Upload ảnh từ URL có dedup.
+
+    URL nguồn đã gặp trong UPLOAD_SOURCE_TTL thì không tải lại; quá hạn thì tải lại
+    để ảnh đổi ở nguồn được cập nhật (nội dung không đổi vẫn dedup theo SHA-256).
+    """
+    backend = get_storage()
+    existing = await run_in_pool(upload_index.get_by_source, url, backend.name, UPLOAD_SOURCE_TTL)
+    if existing is not None and (existing["variants"] is not None or not image_variants.VARIANTS_ENABLED):
+        return {**existing, "sha256": None, "duplicate": True}
+    fileobj, content_type, sha256 = await run_in_pool(fetch_image, url)
+    with fileobj:
+        return await store_file(fileobj, url.rsplit("/", 1)[-1], content_type, sha256=sha256, source_url=url)
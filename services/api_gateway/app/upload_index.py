@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Optional
+from dotenv import load_dotenv
+from app.metrics import register_collector
+
+load_dotenv()
+
+UPLOAD_INDEX_PATH = os.getenv("UPLOAD_INDEX_PATH", "./upload_index.db")
+
+
+class UploadIndex:
+    """Index bền vững sha256 -> ảnh đã upload (SQLite).
+
+    Key gồm cả tên storage backend: đổi backend thì ảnh cũ không bị trả nhầm URL.
+    Ngoài ra nhớ URL nguồn -> sha256 để upload-url lặp lại khỏi phải tải ảnh lần nữa.
+    Được gọi từ upload worker pool nên mọi truy cập đi qua một lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS uploads (
+                sha256 TEXT NOT NULL,
+                backend TEXT NOT NULL,
+                url TEXT NOT NULL,
+                public_id TEXT NOT NULL,
+                variants TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (sha256, backend)
+            );
+            CREATE TABLE IF NOT EXISTS source_urls (
+                source_url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                created_at REAL
+            );
+            """
+        )
+        # Index tạo trước khi có variant: thêm cột
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(uploads)")}
+        if "variants" not in columns:
+            self._db.execute("ALTER TABLE uploads ADD COLUMN variants TEXT")
+        # URL nguồn ghi trước khi có TTL: created_at NULL -> coi như đã hết hạn
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(source_urls)")}
+        if "created_at" not in columns:
+            self._db.execute("ALTER TABLE source_urls ADD COLUMN created_at REAL")
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sha256: str, backend: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, public_id, variants FROM uploads WHERE sha256 = ? AND backend = ?", (sha256, backend)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._row(row)
+
+    def get_by_source(self, source_url: str, backend: str, max_age: float) -> Optional[dict]:
+        """Ảnh đã tải từ source_url trong max_age giây gần đây (ảnh ở nguồn có thể đổi sau đó)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT u.url, u.public_id, u.variants FROM source_urls s JOIN uploads u ON u.sha256 = s.sha256 "
+                "WHERE s.source_url = ? AND u.backend = ? AND s.created_at >= ?",
+                (source_url, backend, time.time() - max_age),
+            ).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self.hits += 1
+        return self._row(row)
+
+    @staticmethod
+    def _row(row) -> dict:
+        variants = json.loads(row[2]) if row[2] else None
+        return {"secure_url": row[0], "public_id": row[1], "variants": variants}
+
+    def put(self, sha256: str, backend: str, result: dict, source_url: Optional[str] = None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO uploads (sha256, backend, url, public_id, variants, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (sha256, backend, result["secure_url"], result["public_id"],
+                 json.dumps(result["variants"]) if result.get("variants") else None, time.time()),
+            )
+            if source_url:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO source_urls (source_url, sha256, created_at) VALUES (?, ?, ?)",
+                    (source_url, sha256, time.time()),
+                )
+            self._db.commit()
+
+    def set_variants(self, sha256: str, backend: str, variants: dict):
+        with self._lock:
+            self._db.execute(
+                "UPDATE uploads SET variants = ? WHERE sha256 = ? AND backend = ?",
+                (json.dumps(variants), sha256, backend),
+            )
+            self._db.commit()
+
+    def remember_source(self, source_url: str, sha256: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO source_urls (source_url, sha256, created_at) VALUES (?, ?, ?)",
+                (source_url, sha256, time.time()),
+            )
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM uploads").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+upload_index = UploadIndex(UPLOAD_INDEX_PATH)
+
+register_collector(
+    "gateway_upload_index", "Upload dedup index statistics", ("stat",),
+    lambda: {(k,): v for k, v in upload_index.stats().items()},
+)
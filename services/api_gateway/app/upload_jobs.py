@@ -0,0 +1,133 @@
+import os
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+from dotenv import load_dotenv
+from app.metrics import register_collector
+
+load_dotenv()
+
+# Số ảnh tối đa trong một batch và số ảnh xử lý song song trong một batch
+UPLOAD_BATCH_MAX_ITEMS = int(os.getenv("UPLOAD_BATCH_MAX_ITEMS", 30))
+UPLOAD_BATCH_CONCURRENCY = int(os.getenv("UPLOAD_BATCH_CONCURRENCY", 4))
+# Job đã xong được giữ lại bao lâu để admin UI poll kết quả
+UPLOAD_JOB_TTL = float(os.getenv("UPLOAD_JOB_TTL", 3600))
+UPLOAD_JOB_MAX = int(os.getenv("UPLOAD_JOB_MAX", 1000))
+
+
+class UploadItem:
+    __slots__ = ("index", "source", "status", "result", "error", "started_at", "finished_at")
+
+    def __init__(self, index: int, source: str):
+        self.index = index
+        self.source = source
+        self.status = "pending"
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        data = {"index": self.index, "source": self.source, "status": self.status}
+        if self.result is not None:
+            data.update(self.result)
+        if self.error is not None:
+            data["error"] = self.error
+        if self.started_at is not None and self.finished_at is not None:
+            data["elapsed_ms"] = round((self.finished_at - self.started_at) * 1000, 1)
+        return data
+
+
+class UploadJob:
+    """Một batch upload: mỗi item là một coroutine, chạy tối đa `concurrency` item cùng lúc"""
+
+    def __init__(self, sources: List[str], concurrency: int):
+        self.id = uuid.uuid4().hex
+        self.items = [UploadItem(index, source) for index, source in enumerate(sources)]
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def status(self) -> str:
+        if self.finished_at is not None:
+            return "done"
+        if any(item.status != "pending" for item in self.items):
+            return "running"
+        return "pending"
+
+    def start(self, workers: List[Callable[[], Awaitable[dict]]]):
+        self._task = asyncio.ensure_future(self._run(workers))
+
+    async def _run(self, workers: List[Callable[[], Awaitable[dict]]]):
+        try:
+            await asyncio.gather(*(self._run_item(item, worker) for item, worker in zip(self.items, workers)))
+        finally:
+            self.finished_at = time.time()
+
+    async def _run_item(self, item: UploadItem, worker: Callable[[], Awaitable[dict]]):
+        async with self._semaphore:
+            item.status = "running"
+            item.started_at = time.time()
+            try:
+                item.result = await worker()
+                item.status = "succeeded"
+            except Exception as e:
+                item.error = getattr(e, "detail", None) or str(e)
+                item.status = "failed"
+            finally:
+                item.finished_at = time.time()
+
+    def to_dict(self) -> dict:
+        counts = {"pending": 0, "running": 0, "succeeded": 0, "failed": 0}
+        for item in self.items:
+            counts[item.status] += 1
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.items),
+            **counts,
+            "items": [item.to_dict() for item in self.items],
+        }
+
+
+class UploadJobStore:
+    """Giữ job trong RAM; job đã xong quá TTL hoặc vượt max_jobs thì bị xoá (cũ nhất trước)"""
+
+    def __init__(self, ttl: float, max_jobs: int):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, UploadJob]" = OrderedDict()
+
+    def _evict(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and now - job.finished_at > self.ttl:
+                del self._jobs[job_id]
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+    def create(self, sources: List[str], concurrency: int = UPLOAD_BATCH_CONCURRENCY) -> UploadJob:
+        self._evict()
+        job = UploadJob(sources, concurrency)
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[UploadJob]:
+        self._evict()
+        return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        running = sum(1 for job in self._jobs.values() if job.finished_at is None)
+        return {"jobs": len(self._jobs), "running": running}
+
+
+upload_jobs = UploadJobStore(UPLOAD_JOB_TTL, UPLOAD_JOB_MAX)
+
+register_collector(
+    "gateway_upload_jobs", "Batch upload jobs kept in memory", ("stat",),
+    lambda: {(k,): v for k, v in upload_jobs.stats().items()},
+)
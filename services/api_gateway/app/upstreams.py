@@ -0,0 +1,511 @@
+import os
+import ssl
+import time
+import random
+import asyncio
+import logging
+import importlib.util
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import httpx
+import certifi
+from dotenv import load_dotenv
+from app.resilience import Bulkhead, CircuitBreaker, UpstreamError, UNAVAILABLE_STATUSES
+from app.metrics import UPSTREAM_CONNECT_SECONDS, UPSTREAM_RESPONSE_SECONDS, register_collector, add_timing
+
+try:
+    import websockets
+except ImportError:  # websockets đi kèm uvicorn[standard]; thiếu thì gateway không proxy WebSocket
+    websockets = None
+
+load_dotenv()
+
+logger = logging.getLogger("gateway.upstreams")
+
+# Các upstream service mà gateway proxy tới: name -> (env prefix, default url)
+UPSTREAM_DEFAULTS = {
+    "auth": ("AUTH_SERVICE", "http://localhost:8002"),
+    "cinema": ("CINEMA_SERVICE", "http://localhost:8003"),
+    "seatbooking": ("SEATBOOKING_SERVICE", "http://localhost:8004"),
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class UpstreamConfig:
+    """Cấu hình connection pool cho một upstream, đọc từ env theo prefix.
+
+    Ví dụ với prefix CINEMA_SERVICE:
+        CINEMA_SERVICE_URL, CINEMA_SERVICE_MAX_CONNECTIONS,
+        CINEMA_SERVICE_MAX_KEEPALIVE, CINEMA_SERVICE_KEEPALIVE_EXPIRY,
+        CINEMA_SERVICE_HTTP2, CINEMA_SERVICE_MAX_CONCURRENCY,
+        CINEMA_SERVICE_BULKHEAD_WAIT, CINEMA_SERVICE_BREAKER_FAILURES,
+        CINEMA_SERVICE_BREAKER_RESET
+
+    CINEMA_SERVICE_URL có thể là danh sách replica cách nhau bởi dấu phẩy:
+        CINEMA_SERVICE_URL=http://cinema-1:8003,http://cinema-2:8003
+    Khi đó thêm các biến cho load balancing:
+        CINEMA_SERVICE_LB (least_outstanding | ewma), CINEMA_SERVICE_HEALTH_PATH,
+        CINEMA_SERVICE_HEALTH_INTERVAL, CINEMA_SERVICE_EJECT_FAILURES, CINEMA_SERVICE_EJECT_TIME
+    """
+
+    def __init__(self, name: str, prefix: str, default_url: str):
+        self.name = name
+        raw_url = os.getenv(f"{prefix}_URL", default_url)
+        self.replica_urls = [u.strip().rstrip("/") for u in raw_url.split(",") if u.strip()] or [default_url]
+        # URL của replica đầu tiên là base URL "logic" mà route dùng để ghép path;
+        # host thật được thay theo replica được chọn ở tầng transport
+        self.url = self.replica_urls[0]
+        self.max_connections = _env_int(f"{prefix}_MAX_CONNECTIONS", 100)
+        self.max_keepalive = _env_int(f"{prefix}_MAX_KEEPALIVE", 20)
+        self.keepalive_expiry = _env_float(f"{prefix}_KEEPALIVE_EXPIRY", 30.0)
+        # HTTP/2 cần package h2 (httpx[http2]); không có thì dùng HTTP/1.1
+        self.http2 = _env_bool(f"{prefix}_HTTP2") and importlib.util.find_spec("h2") is not None
+        # Bulkhead: số request đồng thời tối đa và thời gian chờ slot trước khi trả 503
+        self.max_concurrency = _env_int(f"{prefix}_MAX_CONCURRENCY", 100)
+        self.bulkhead_wait = _env_float(f"{prefix}_BULKHEAD_WAIT", 1.0)
+        # Circuit breaker: số lỗi liên tiếp để mở và thời gian trước khi thử lại
+        self.breaker_failures = _env_int(f"{prefix}_BREAKER_FAILURES", 5)
+        self.breaker_reset = _env_float(f"{prefix}_BREAKER_RESET", 30.0)
+        # Load balancing giữa các replica
+        self.lb = os.getenv(f"{prefix}_LB", "least_outstanding").lower()
+        if self.lb not in ("least_outstanding", "ewma"):
+            raise ValueError(f"{prefix}_LB must be least_outstanding or ewma")
+        # Health check chủ động (0 = tắt); chỉ chạy khi có nhiều hơn một replica
+        self.health_path = os.getenv(f"{prefix}_HEALTH_PATH", "/health")
+        self.health_interval = _env_float(f"{prefix}_HEALTH_INTERVAL", 10.0)
+        # Loại replica tạm thời sau N lỗi liên tiếp (lỗi kết nối, timeout, 5xx)
+        self.eject_failures = _env_int(f"{prefix}_EJECT_FAILURES", 3)
+        self.eject_time = _env_float(f"{prefix}_EJECT_TIME", 30.0)
+
+
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    name: UpstreamConfig(name, prefix, default_url)
+    for name, (prefix, default_url) in UPSTREAM_DEFAULTS.items()
+}
+
+
+def service_url(name: str) -> str:
+    """Base URL dùng để ghép path khi gọi upstream `name` (replica đầu tiên)"""
+    return UPSTREAMS[name].url
+
+# Timeout mặc định cho mọi request proxy (route có thể khai báo timeout riêng)
+DEFAULT_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+# Load CA bundle một lần cho toàn bộ gateway
+_ssl_context = ssl.create_default_context(cafile=certifi.where())
+
+
+class _ReplicaTransport(httpx.AsyncBaseTransport):
+    """Đổi scheme/host/port của request (ghép theo base URL logic) sang replica được chọn"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, replica_url: str):
+        self._transport = transport
+        target = httpx.URL(replica_url)
+        self._scheme = target.scheme
+        self._host = target.host
+        self._port = target.port
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(scheme=self._scheme, host=self._host, port=self._port)
+        request.headers["Host"] = request.url.netloc.decode("ascii")
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class Replica:
+    """Một replica của upstream: connection pool riêng, số request đang chạy, EWMA latency,
+    trạng thái health check chủ động và loại tạm thời (passive ejection)"""
+
+    # Hệ số làm mượt EWMA latency; lỗi không đo được latency được tính như một request chậm
+    EWMA_ALPHA = 0.3
+    FAILURE_PENALTY = 1.0
+
+    def __init__(self, url: str, config: UpstreamConfig):
+        self.url = url
+        self.config = config
+        self.client: Optional[httpx.AsyncClient] = None
+        self.outstanding = 0
+        self.ewma: Optional[float] = None
+        self.healthy = True
+        self.health_failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.requests = 0
+        self.failures = 0
+
+    def get_client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            limits = httpx.Limits(
+                max_connections=self.config.max_connections,
+                max_keepalive_connections=self.config.max_keepalive,
+                keepalive_expiry=self.config.keepalive_expiry,
+            )
+            transport = httpx.AsyncHTTPTransport(limits=limits, http2=self.config.http2, verify=_ssl_context)
+            if self.url != self.config.url:
+                transport = _ReplicaTransport(transport, self.url)
+            self.client = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, transport=transport)
+        return self.client
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def score(self) -> float:
+        """Điểm cho EWMA balancing: latency trung bình x (số request đang chạy + 1)"""
+        return (self.ewma if self.ewma is not None else 0.0) * (self.outstanding + 1)
+
+    def record(self, elapsed: Optional[float], failed: bool):
+        if elapsed is None:
+            elapsed = max(self.FAILURE_PENALTY, self.ewma or 0.0)
+        self.ewma = elapsed if self.ewma is None else self.EWMA_ALPHA * elapsed + (1 - self.EWMA_ALPHA) * self.ewma
+        if not failed:
+            self.consecutive_failures = 0
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        now = time.monotonic()
+        # Request đã chọn replica trước khi nó bị loại không tính thêm lần loại nữa
+        if self.consecutive_failures >= self.config.eject_failures and now >= self.ejected_until:
+            self.consecutive_failures = 0
+            self.ejected_until = now + self.config.eject_time
+            self.ejections += 1
+            logger.warning("Ejecting replica %s of %s for %.0fs", self.url, self.config.name, self.config.eject_time)
+
+    def pool_size(self) -> int:
+        transport = getattr(self.client, "_transport", None)
+        transport = getattr(transport, "_transport", transport)
+        pool = getattr(transport, "_pool", None)
+        return len(getattr(pool, "connections", ()))
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "ejected_for": round(max(0.0, self.ejected_until - now), 1),
+            "outstanding": self.outstanding,
+            "ewma_ms": round(self.ewma * 1000, 2) if self.ewma is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "connections": self.pool_size(),
+        }
+
+
+class Upstream:
+    """Một upstream service: bulkhead và circuit breaker riêng, một hoặc nhiều replica"""
+
+    def __init__(self, config: UpstreamConfig):
+        self.config = config
+        self.name = config.name
+        self.url = config.url
+        self.replicas: List[Replica] = [Replica(url, config) for url in config.replica_urls]
+        self.bulkhead = Bulkhead(config.max_concurrency, config.bulkhead_wait)
+        self.breaker = CircuitBreaker(config.breaker_failures, config.breaker_reset)
+        self._tls = config.url.startswith("https://")
+        self._health_task: Optional[asyncio.Task] = None
+
+    @property
+    def client(self) -> Optional[httpx.AsyncClient]:
+        return self.replicas[0].client
+
+    def get_client(self) -> httpx.AsyncClient:
+        return self.replicas[0].get_client()
+
+    async def aclose(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for replica in self.replicas:
+            await replica.aclose()
+
+    def pick(self) -> Replica:
+        """Chọn replica: bỏ replica không healthy/đang bị loại; nếu không còn replica nào
+        thì dùng tất cả (thà thử còn hơn trả lỗi ngay). Hoà điểm thì chọn ngẫu nhiên."""
+        if len(self.replicas) == 1:
+            return self.replicas[0]
+        now = time.monotonic()
+        candidates = [r for r in self.replicas if r.available(now)] or self.replicas
+        # Tránh replica vừa lỗi (chưa đủ lỗi để bị loại) khi còn replica khác, để retry đi chỗ khác
+        candidates = [r for r in candidates if r.consecutive_failures == 0] or candidates
+        if self.config.lb == "ewma":
+            # Replica chưa có mẫu latency được thử trước
+            key = Replica.score
+        else:
+            key = lambda r: r.outstanding
+        best = min(key(r) for r in candidates)
+        return random.choice([r for r in candidates if key(r) == best])
+
+    def start_health_checks(self):
+        if len(self.replicas) > 1 and self.config.health_interval > 0 and self._health_task is None:
+            self._health_task = asyncio.ensure_future(self._health_loop())
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+            await asyncio.sleep(self.config.health_interval)
+
+    async def _check(self, replica: Replica):
+        """Health check chủ động: mọi status < 500 đều tính là sống (service không có /health
+        trả 404 nhưng vẫn phục vụ được). Hỏng 2 lần liên tiếp -> unhealthy, 1 lần ok -> healthy."""
+        try:
+            resp = await replica.get_client().get(
+                self.config.url + self.config.health_path, timeout=httpx.Timeout(2.0)
+            )
+            ok = resp.status_code < 500
+        except Exception:
+            ok = False
+        if ok:
+            if not replica.healthy:
+                logger.warning("Replica %s of %s is healthy again", replica.url, self.name)
+            replica.healthy = True
+            replica.health_failures = 0
+            return
+        replica.health_failures += 1
+        if replica.health_failures >= 2 and replica.healthy:
+            replica.healthy = False
+            logger.warning("Replica %s of %s failed health checks", replica.url, self.name)
+
+    async def call(self, send: Callable[[httpx.AsyncClient, dict], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Gọi upstream qua circuit breaker và bulkhead.
+
+        send(client, extensions) phải truyền extensions vào request httpx để đo thời gian connect.
+
+        Breaker mở -> 503 ngay; timeout -> 504; lỗi kết nối -> 502. Timeout, lỗi kết nối
+        và response 502/503/504 được tính là lỗi cho breaker; 500 của ứng dụng thì không.
+        Response stream (send(..., stream=True)) giữ slot bulkhead tới khi được đóng.
+        """
+        if not self.breaker.before_call():
+            raise UpstreamError(503, f"Upstream {self.name} is unavailable")
+        try:
+            await self.bulkhead.acquire()
+        except BaseException:
+            # Không gọi được upstream thì không tính là lỗi, trả lại lượt thử half-open
+            self.breaker.release_trial()
+            raise
+        replica = self.pick()
+        replica.outstanding += 1
+        replica.requests += 1
+        started = time.perf_counter()
+        resp = None
+        try:
+            resp = await send(replica.get_client(), {"trace": self._connect_tracer()})
+        except httpx.ConnectTimeout:
+            self._record_failure(replica)
+            raise UpstreamError(504, f"Upstream {self.name} connect timed out", retryable=True)
+        except httpx.TimeoutException:
+            self._record_failure(replica, time.perf_counter() - started)
+            raise UpstreamError(504, f"Upstream {self.name} timed out")
+        except httpx.ConnectError:
+            self._record_failure(replica)
+            raise UpstreamError(502, f"Upstream {self.name} connection error", retryable=True)
+        except httpx.TransportError:
+            self._record_failure(replica)
+            raise UpstreamError(502, f"Upstream {self.name} connection error")
+        except BaseException:
+            self.breaker.release_trial()
+            raise
+        finally:
+            if resp is None or resp.is_closed:
+                self._release(replica)
+            else:
+                # send(..., stream=True): body chưa đọc xong, giữ slot tới khi response đóng
+                self._release_on_close(resp, replica)
+        elapsed = time.perf_counter() - started
+        UPSTREAM_RESPONSE_SECONDS.observe(elapsed, self.name)
+        add_timing("upstream", elapsed)
+        if resp.status_code in UNAVAILABLE_STATUSES:
+            self._record_failure(replica, elapsed)
+        else:
+            self.breaker.record_success()
+            replica.record(elapsed, failed=False)
+        return resp
+
+    def _release(self, replica: Replica):
+        replica.outstanding -= 1
+        self.bulkhead.release()
+
+    def _release_on_close(self, resp: httpx.Response, replica: Replica):
+        """Response stream vẫn giữ connection tới upstream: trả slot bulkhead và outstanding
+        của replica khi resp.aclose() (httpx tự gọi khi đọc hết body), đúng một lần"""
+        aclose = resp.aclose
+        released = False
+
+        async def release_on_close():
+            nonlocal released
+            try:
+                await aclose()
+            finally:
+                if not released:
+                    released = True
+                    self._release(replica)
+
+        resp.aclose = release_on_close
+
+    async def connect_websocket(self, path: str, headers: List[Tuple[str, str]], subprotocols: List[str],
+                                open_timeout: float, max_size: int, max_queue: int):
+        """Mở WebSocket tới một replica, qua circuit breaker như call().
+
+        Không đi qua bulkhead: connection sống lâu, giữ slot sẽ chặn request HTTP thường.
+        max_queue giới hạn số message nhận từ upstream chưa được đọc; đầy thì ngừng đọc socket
+        và backpressure dồn về upstream qua TCP.
+        """
+        if websockets is None:
+            raise UpstreamError(501, "WebSocket proxying requires the websockets package")
+        if not self.breaker.before_call():
+            raise UpstreamError(503, f"Upstream {self.name} is unavailable")
+        replica = self.pick()
+        url = "ws" + replica.url[len("http"):] + path
+        started = time.perf_counter()
+        try:
+            connection = await websockets.connect(
+                url,
+                extra_headers=headers,
+                subprotocols=subprotocols or None,
+                open_timeout=open_timeout,
+                max_size=max_size,
+                max_queue=max_queue,
+                ssl=_ssl_context if url.startswith("wss://") else None,
+            )
+        except websockets.InvalidStatusCode as exc:
+            # Upstream từ chối handshake: chỉ 502/503/504 mới là upstream không phục vụ được
+            if exc.status_code in UNAVAILABLE_STATUSES:
+                self._record_failure(replica)
+            else:
+                self.breaker.record_success()
+            raise UpstreamError(exc.status_code, f"Upstream {self.name} rejected the WebSocket handshake")
+        except asyncio.TimeoutError:
+            self._record_failure(replica)
+            raise UpstreamError(504, f"Upstream {self.name} connect timed out")
+        except (OSError, websockets.WebSocketException):
+            self._record_failure(replica)
+            raise UpstreamError(502, f"Upstream {self.name} connection error")
+        except BaseException:
+            self.breaker.release_trial()
+            raise
+        elapsed = time.perf_counter() - started
+        UPSTREAM_CONNECT_SECONDS.observe(elapsed, self.name)
+        self.breaker.record_success()
+        replica.record(elapsed, failed=False)
+        return connection
+
+    def _record_failure(self, replica: Replica, elapsed: Optional[float] = None):
+        replica.record(elapsed, failed=True)
+        # Nhiều replica: lỗi của một replica được xử lý bằng ejection; breaker của cả upstream
+        # chỉ đếm lỗi khi không còn replica nào dùng được
+        now = time.monotonic()
+        if len(self.replicas) == 1 or not any(r.available(now) for r in self.replicas):
+            self.breaker.record_failure()
+
+    def _connect_tracer(self):
+        """Trace callback của httpcore: đo thời gian mở connection mới (TCP, cộng TLS nếu https)"""
+        connect_done = "connection.start_tls.complete" if self._tls else "connection.connect_tcp.complete"
+        started = [0.0]
+
+        async def trace(event_name, info):
+            if event_name == "connection.connect_tcp.started":
+                started[0] = time.perf_counter()
+            elif event_name == connect_done:
+                elapsed = time.perf_counter() - started[0]
+                UPSTREAM_CONNECT_SECONDS.observe(elapsed, self.name)
+                add_timing("connect", elapsed)
+
+        return trace
+
+    def pool_size(self) -> int:
+        """Số connection đang mở trong pool của mọi replica (đọc từ httpcore)"""
+        return sum(replica.pool_size() for replica in self.replicas)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "lb": self.config.lb,
+            "breaker": self.breaker.stats(),
+            "bulkhead": self.bulkhead.stats(),
+            "replicas": [replica.stats() for replica in self.replicas],
+        }
+
+
+_upstreams: Dict[str, Upstream] = {}
+
+
+async def startup():
+    """Mở một connection pool keep-alive cho mỗi replica, bật health check chủ động"""
+    for config in UPSTREAMS.values():
+        upstream = get_upstream(config.url)
+        for replica in upstream.replicas:
+            replica.get_client()
+        upstream.start_health_checks()
+
+
+async def shutdown():
+    """Đóng toàn bộ connection pool khi gateway tắt"""
+    for upstream in _upstreams.values():
+        await upstream.aclose()
+
+
+def get_upstream(url_service: str) -> Upstream:
+    """Lấy upstream theo base URL; URL lạ được tạo với cấu hình mặc định"""
+    upstream = _upstreams.get(url_service)
+    if upstream is None:
+        config = next((c for c in UPSTREAMS.values() if c.url == url_service), None)
+        if config is None:
+            config = UpstreamConfig(url_service, "GATEWAY_UPSTREAM", url_service)
+            config.url = url_service
+        upstream = Upstream(config)
+        _upstreams[url_service] = upstream
+    return upstream
+
+
+def get_client(url_service: str) -> httpx.AsyncClient:
+    """Lấy client đã pool theo base URL của upstream"""
+    return get_upstream(url_service).get_client()
+
+
+def upstream_stats() -> list:
+    return [upstream.stats() for upstream in _upstreams.values()]
+
+
+register_collector(
+    "gateway_upstream_in_flight", "Requests currently in flight per upstream", ("upstream",),
+    lambda: {(u.name,): u.bulkhead.in_flight for u in _upstreams.values()},
+)
+register_collector(
+    "gateway_upstream_pool_connections", "Open connections in each upstream pool", ("upstream",),
+    lambda: {(u.name,): u.pool_size() for u in _upstreams.values()},
+)
+register_collector(
+    "gateway_upstream_replica_outstanding", "Requests in flight per upstream replica", ("upstream", "replica"),
+    lambda: {(u.name, r.url): r.outstanding for u in _upstreams.values() for r in u.replicas},
+)
+register_collector(
+    "gateway_upstream_replica_available", "1 if the replica is healthy and not ejected", ("upstream", "replica"),
+    lambda: {(u.name, r.url): int(r.available(time.monotonic())) for u in _upstreams.values() for r in u.replicas},
+)
+register_collector(
+    "gateway_upstream_breaker_open", "1 if the upstream circuit breaker is not closed", ("upstream",),
+    lambda: {(u.name,): int(u.breaker.state != CircuitBreaker.CLOSED) for u in _upstreams.values()},
+)
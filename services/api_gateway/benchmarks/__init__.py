@@ -0,0 +1 @@
+# API Gateway benchmarks
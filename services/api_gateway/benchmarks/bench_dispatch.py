@@ -0,0 +1,158 @@
+"""Benchmark chi phí dispatch mỗi request: router catch-all cũ vs bảng route + trie.
+
+Chạy từ thư mục services/api_gateway:
+    python -m benchmarks.bench_dispatch
+
+"before" dựng lại layout cũ: mỗi module trong app/routes/ có APIRouter riêng với các
+catch-all /{path:path} và Depends(verify_*). "after" là dispatcher hiện tại. proxy()
+được thay bằng stub trả response rỗng nên số đo chỉ gồm routing + auth dependency.
+"""
+import os
+import time
+import asyncio
+import jwt
+
+# Rate limiter (app/ratelimit.py) bật mặc định và mọi request bench cùng một IP:
+# tắt trước khi import app để chỉ đo routing + auth, không bị 429 giữa chừng
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+from fastapi import APIRouter, Depends, FastAPI, Request
+from starlette.responses import Response
+from app.routes import dispatcher
+from app.routes.baseRequest import SECRET_KEY, ALGORITHM, verify_jwt, verify_admin
+
+ITERATIONS = 3000
+
+
+async def stub_proxy(request, path, url_service, user_id=None, **options):
+    return Response(b"ok")
+
+
+def legacy_app() -> FastAPI:
+    """Layout router cũ (trước bảng route), cùng thứ tự include như app/main.py cũ"""
+    app = FastAPI()
+
+    def public_and_admin(name, write_dep=verify_admin):
+        router = APIRouter()
+
+        @router.api_route("/{path:path}", methods=["GET"])
+        async def public(request: Request, path: str):
+            return await stub_proxy(request, path, name)
+
+        @router.api_route("/{path:path}", methods=["POST", "PUT", "DELETE", "PATCH"])
+        async def protected(request: Request, path: str, payload=Depends(write_dep)):
+            return await stub_proxy(request, path, name, payload.get("sub"))
+        return router
+
+    auth = APIRouter()
+
+    @auth.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
+    async def auth_proxy(request: Request, path: str):
+        return await stub_proxy(request, path, "auth")
+
+    users = APIRouter()
+
+    @users.api_route("/", methods=["GET"])
+    async def user_list(request: Request, payload=Depends(verify_admin)):
+        return await stub_proxy(request, "", "auth")
+
+    @users.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
+    async def user_proxy(request: Request, path: str, payload=Depends(verify_jwt)):
+        return await stub_proxy(request, path, "auth")
+
+    bookings = APIRouter()
+
+    @bookings.api_route("/tickets", methods=["GET"])
+    async def tickets(request: Request, payload=Depends(verify_admin)):
+        return await stub_proxy(request, "tickets", "booking")
+
+    @bookings.api_route("/{booking_id}/checkin", methods=["POST"])
+    async def checkin(request: Request, booking_id: str, payload=Depends(verify_admin)):
+        return await stub_proxy(request, booking_id, "booking")
+
+    @bookings.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+    async def booking_proxy(request: Request, path: str = "", payload=Depends(verify_jwt)):
+        return await stub_proxy(request, path, "booking")
+
+    single = {}
+    for name in ("dashboard", "promotions", "revenue"):
+        router = APIRouter()
+
+        @router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
+        async def admin_proxy(request: Request, path: str, payload=Depends(verify_admin)):
+            return await stub_proxy(request, path, "admin")
+        single[name] = router
+
+    app.include_router(auth, prefix="/api/v1/auth")
+    app.include_router(users, prefix="/api/v1/users")
+    app.include_router(public_and_admin("cinemas"), prefix="/api/v1/cinemas")
+    app.include_router(public_and_admin("movies", verify_jwt), prefix="/api/v1/movies")
+    app.include_router(public_and_admin("actors"), prefix="/api/v1/actors")
+    app.include_router(public_and_admin("showtimes"), prefix="/api/v1/showtimes")
+    app.include_router(bookings, prefix="/api/v1/bookings")
+    app.include_router(single["dashboard"], prefix="/api/v1/dashboard")
+    app.include_router(single["promotions"], prefix="/api/v1/promotions")
+    app.include_router(single["revenue"], prefix="/api/v1/revenue")
+    app.include_router(public_and_admin("advertisements"), prefix="/api/v1/advertisements")
+    return app
+
+
+def table_app() -> FastAPI:
+    dispatcher.proxy = stub_proxy
+    app = FastAPI()
+    app.include_router(dispatcher.router)
+    return app
+
+
+async def call(app, method: str, path: str, headers) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": headers, "client": ("127.0.0.1", 1), "server": ("gw", 80),
+    }
+    status = [0]
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status[0] = message["status"]
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def bench(name, app, method, path, headers):
+    assert await call(app, method, path, headers) == 200, (name, method, path)
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await call(app, method, path, headers)
+    return (time.perf_counter() - started) / ITERATIONS
+
+
+async def main():
+    token = jwt.encode({"sub": "1", "role": "admin", "exp": int(time.time()) + 3600}, SECRET_KEY, algorithm=ALGORITHM)
+    auth = [(b"authorization", f"Bearer {token}".encode())]
+    cases = [
+        ("GET", "/api/v1/auth/me", []),
+        ("GET", "/api/v1/movies/123", []),
+        ("GET", "/api/v1/showtimes/movie/1/upcoming", []),
+        ("POST", "/api/v1/bookings/abc/confirm", auth),
+        ("GET", "/api/v1/advertisements/banners", []),
+        ("PUT", "/api/v1/advertisements/banners/1", auth),
+    ]
+    before, after = legacy_app(), table_app()
+    print(f"{'request':<48} {'before':>10} {'after':>10}")
+    for method, path, headers in cases:
+        b = await bench("before", before, method, path, headers)
+        a = await bench("after", after, method, path, headers)
+        print(f"{method + ' ' + path:<48} {b * 1e6:8.1f}us {a * 1e6:8.1f}us")
+
+    started = time.perf_counter()
+    for _ in range(100_000):
+        dispatcher.route_trie.match("/api/v1/showtimes/movie/1/upcoming", "GET")
+    print(f"\nroute_trie.match: {(time.perf_counter() - started) / 100_000 * 1e9:.0f} ns/op")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
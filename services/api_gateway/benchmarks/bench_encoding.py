@@ -0,0 +1,90 @@
+"""Benchmark encoding body giữa service và gateway: json chuẩn vs orjson vs msgpack.
+
+Chạy từ thư mục services/api_gateway:
+    python -m benchmarks.bench_encoding
+
+Payload mô phỏng response lớn của cinema-service (sơ đồ ghế của một phòng, danh sách rạp
+kèm phòng chiếu). Với mỗi encoding đo số byte, thời gian encode (phía service) và decode,
+cộng thêm chi phí gateway chuyển msgpack -> JSON ở edge (encoding.to_json).
+"""
+import json
+import time
+from app import encoding
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ITERATIONS = 300
+
+
+def seat_map(rows: int = 20, cols: int = 24) -> dict:
+    seats = [
+        {
+            "id": r * cols + c,
+            "row": chr(ord("A") + r),
+            "number": c + 1,
+            "seat_type": "vip" if 6 <= r <= 12 else "standard",
+            "price": 120000.0 if 6 <= r <= 12 else 85000.0,
+            "status": "booked" if (r * c) % 7 == 0 else "available",
+            "is_active": True,
+        }
+        for r in range(rows) for c in range(cols)
+    ]
+    return {"room_id": 1, "showtime_id": 42, "seats": seats}
+
+
+def cinema_list(count: int = 60) -> list:
+    return [
+        {
+            "id": i,
+            "name": f"Rạp chiếu phim số {i}",
+            "address": f"{i} Nguyễn Huệ, Quận 1, TP. Hồ Chí Minh",
+            "phone": "0281234567",
+            "latitude": 10.77 + i / 1000,
+            "longitude": 106.70 + i / 1000,
+            "rooms": [
+                {"id": i * 10 + j, "name": f"Phòng {j}", "capacity": 120, "room_type": "2D"}
+                for j in range(8)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def codecs():
+    result = [("json", lambda d: json.dumps(d).encode(), json.loads)]
+    if orjson is not None:
+        result.append(("orjson", orjson.dumps, orjson.loads))
+    if msgpack is not None:
+        result.append(("msgpack", lambda d: msgpack.packb(d, use_bin_type=True), lambda b: msgpack.unpackb(b, raw=False)))
+    return result
+
+
+def timed(fn, arg) -> float:
+    started = time.process_time()
+    for _ in range(ITERATIONS):
+        fn(arg)
+    return (time.process_time() - started) / ITERATIONS
+
+
+def main():
+    payloads = [("seat map 20x24", seat_map()), ("cinemas x60", cinema_list())]
+    print(f"{'payload':<16} {'codec':<10} {'bytes':>9} {'encode':>10} {'decode':>10} {'edge->json':>11}")
+    for label, data in payloads:
+        for name, dumps, loads in codecs():
+            body = dumps(data)
+            enc = timed(dumps, data)
+            dec = timed(loads, body)
+            edge = f"{timed(encoding.to_json, body) * 1e6:9.1f}us" if name == "msgpack" else f"{'-':>11}"
+            print(f"{label:<16} {name:<10} {len(body):>9} {enc * 1e6:8.1f}us {dec * 1e6:8.1f}us {edge}")
+
+
+if __name__ == "__main__":
+    main()
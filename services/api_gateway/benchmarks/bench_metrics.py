@@ -0,0 +1,76 @@
+"""Microbenchmark chi phí ghi metrics trên hot path của gateway.
+
+Chạy từ thư mục services/api_gateway:
+    python -m benchmarks.bench_metrics
+
+Đo chi phí trung bình mỗi request của phần ghi metrics (counter + các histogram +
+gauge in-flight), so với ngân sách vài micro giây của một request proxy.
+"""
+import time
+import threading
+from app.metrics import Counter, Gauge, Histogram
+
+ITERATIONS = 200_000
+ROUTES = ["/api/v1/movies/{path:path}", "/api/v1/showtimes/{path:path}", "/api/v1/bookings/{path:path}"]
+
+
+def bench(name, fn, iterations=ITERATIONS):
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - started
+    print(f"{name:<40} {elapsed / iterations * 1e9:8.0f} ns/op")
+    return elapsed / iterations
+
+
+def main():
+    requests_total = Counter("bench_requests_total", "bench", ("route", "method", "status", "upstream"))
+    request_seconds = Histogram("bench_request_seconds", "bench", ("route", "method"))
+    upstream_seconds = Histogram("bench_upstream_seconds", "bench", ("upstream",))
+    auth_seconds = Histogram("bench_auth_seconds", "bench")
+    in_flight = Gauge("bench_in_flight", "bench")
+    i = [0]
+
+    def counter_inc():
+        requests_total.inc(ROUTES[0], "GET", "200", "cinema")
+
+    def histogram_observe():
+        request_seconds.observe(0.0123, ROUTES[0], "GET")
+
+    def per_request():
+        # Toàn bộ những gì một request proxy ghi: in-flight, auth, upstream, total, counter
+        i[0] += 1
+        route = ROUTES[i[0] % 3]
+        in_flight.inc()
+        auth_seconds.observe(0.00004)
+        upstream_seconds.observe(0.0081, "cinema")
+        in_flight.dec()
+        requests_total.inc(route, "GET", "200", "cinema")
+        request_seconds.observe(0.0123, route, "GET")
+
+    bench("Counter.inc", counter_inc)
+    bench("Histogram.observe", histogram_observe)
+    per_request_cost = bench("per request (6 recordings)", per_request)
+
+    # Ghi từ nhiều thread cùng lúc (dependency sync chạy trong threadpool)
+    threads = [threading.Thread(target=lambda: [histogram_observe() for _ in range(50_000)]) for _ in range(4)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"{'Histogram.observe, 4 threads':<40} {(time.perf_counter() - started) / 200_000 * 1e9:8.0f} ns/op")
+
+    started = time.perf_counter()
+    for _ in range(100):
+        "\n".join(request_seconds.expose() + requests_total.expose())
+    print(f"{'expose (scrape)':<40} {(time.perf_counter() - started) / 100 * 1e6:8.0f} us/op")
+
+    budget = 20e-6
+    print(f"\nper-request overhead {per_request_cost * 1e6:.2f} us (budget {budget * 1e6:.0f} us): "
+          f"{'OK' if per_request_cost < budget else 'OVER BUDGET'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Load test gateway: đo overhead của gateway với upstream giả, không cần mạng.
+
+Chạy từ thư mục services/api_gateway:
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --concurrency 1,32,128 --duration 15 --latency-ms 20 --payload-bytes 8192
+    python -m benchmarks.loadtest --scenarios public_get,upload --json results.json
+
+Ba process trên cùng máy:
+- benchmarks.stub_upstreams: auth/cinema/seatbooking giả (latency, kích thước payload cấu hình được)
+- gateway thật (uvicorn app.main:app), các *_SERVICE_URL trỏ vào stub
+- process này: sinh tải với số kết nối đồng thời cố định, mỗi mức chạy `--duration` giây
+
+Báo cáo mỗi kịch bản x mức concurrency: throughput, latency p50/p95/p99, lỗi, CPU gateway
+trên mỗi request và RSS của process gateway (đọc /proc, chỉ Linux).
+Rate limit, access log và sync feed thu hồi bị tắt, upload (token admin, PNG thật) dùng storage
+local trong thư mục tạm để số đo chỉ là gateway.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import base64
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List
+import httpx
+import jwt
+
+GATEWAY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET_KEY = "loadtest-secret-key-0123456789abcdef"
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+# PNG 1x1 hợp lệ: upload kiểm tra magic bytes nên body phải là ảnh thật
+PNG_1X1 = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def proc_status(pid: int) -> Dict[str, float]:
+    """RSS hiện tại / đỉnh (MB) và tổng CPU (giây) của process"""
+    result = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                result[line.split(":")[0]] = int(line.split()[1]) / 1024
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime, stime là field 14, 15 (tính từ 1); sau ")" là field 3
+    result["cpu"] = (int(fields[11]) + int(fields[12])) / CLK_TCK
+    return result
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class Scenario:
+    def __init__(self, name: str, method: str, path: str, auth: str = None, body: str = None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.auth = auth
+        self.body = body
+
+
+SCENARIOS = {
+    s.name: s for s in (
+        # actors không nằm trong edge cache -> mọi request đều tới upstream
+        Scenario("public_get", "GET", "/api/v1/actors/1"),
+        Scenario("jwt_get", "GET", "/api/v1/users/me", auth="user"),
+        Scenario("admin_post", "POST", "/api/v1/promotions/", auth="admin", body="json"),
+        Scenario("upload", "POST", "/api/v1/upload/", auth="admin", body="image"),
+    )
+}
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix="gateway-loadtest-")
+        self.stub_ports = [free_port() for _ in range(3)]
+        self.gateway_port = free_port()
+        self.processes: List[subprocess.Popen] = []
+        now = int(time.time())
+        self.tokens = {
+            "user": jwt.encode({"sub": "42", "role": "user", "exp": now + 3600}, SECRET_KEY, algorithm="HS256"),
+            "admin": jwt.encode({"sub": "1", "role": "admin", "exp": now + 3600}, SECRET_KEY, algorithm="HS256"),
+        }
+        # Phần đệm sau IEND để file có kích thước --upload-bytes (decoder ảnh bỏ qua)
+        self.upload_padding = os.urandom(max(0, args.upload_bytes - len(PNG_1X1) - 8))
+        self.upload_counter = 0
+
+    def start(self):
+        stub = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.stub_upstreams",
+             "--ports", ",".join(map(str, self.stub_ports)),
+             "--latency-ms", str(self.args.latency_ms), "--payload-bytes", str(self.args.payload_bytes)],
+            cwd=GATEWAY_DIR,
+        )
+        self.processes.append(stub)
+        auth_port, cinema_port, seatbooking_port = self.stub_ports
+        env = {
+            **os.environ,
+            "AUTH_SERVICE_URL": f"http://127.0.0.1:{auth_port}",
+            "CINEMA_SERVICE_URL": f"http://127.0.0.1:{cinema_port}",
+            "SEATBOOKING_SERVICE_URL": f"http://127.0.0.1:{seatbooking_port}",
+            "SECRET_KEY": SECRET_KEY,
+            "RATE_LIMIT_ENABLED": "false",
+            # Access log của gateway ghi ra stdout mỗi request, làm nhiễu số đo
+            "ACCESS_LOG_ENABLED": "false",
+            # Stub auth không có feed thu hồi: sync nền chỉ sinh lỗi và traffic làm nhiễu số đo
+            "REVOCATION_ENABLED": "false",
+            "UPLOAD_STORAGE": "local",
+            "LOCAL_STORAGE_ROOT": os.path.join(self.workdir, "media"),
+            "UPLOAD_INDEX_PATH": os.path.join(self.workdir, "upload_index.db"),
+            "IMAGE_VARIANTS": "false",
+        }
+        gateway = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(self.gateway_port), "--log-level", "warning", "--no-access-log"],
+            cwd=GATEWAY_DIR, env=env,
+        )
+        self.processes.append(gateway)
+        self.gateway_pid = gateway.pid
+        self._wait_ready([f"http://127.0.0.1:{self.gateway_port}/health"])
+
+    def _wait_ready(self, urls, timeout: float = 20.0):
+        deadline = time.monotonic() + timeout
+        for url in urls:
+            while True:
+                try:
+                    if httpx.get(url, timeout=1.0).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{url} did not become ready")
+                time.sleep(0.2)
+
+    def stop(self):
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def _request_kwargs(self, scenario: Scenario) -> dict:
+        kwargs = {"headers": {}}
+        if scenario.auth:
+            kwargs["headers"]["Authorization"] = f"Bearer {self.tokens[scenario.auth]}"
+        if scenario.body == "json":
+            kwargs["json"] = {"code": "LOADTEST", "discount_percent": 10}
+        elif scenario.body == "image":
+            # Nội dung khác nhau mỗi lần để không rơi vào nhánh dedup
+            self.upload_counter += 1
+            content = PNG_1X1 + self.upload_counter.to_bytes(8, "big") + self.upload_padding
+            kwargs["files"] = {"file": ("loadtest.png", content, "image/png")}
+        return kwargs
+
+    async def run_level(self, scenario: Scenario, concurrency: int) -> dict:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        base_url = f"http://127.0.0.1:{self.gateway_port}"
+        latencies: List[float] = []
+        errors = {}
+
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+            async def worker(deadline: float, record: bool):
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        resp = await client.request(scenario.method, scenario.path, **self._request_kwargs(scenario))
+                        status = resp.status_code
+                    except httpx.HTTPError as e:
+                        status = type(e).__name__
+                    if not record:
+                        continue
+                    if status == 200 or status == 201:
+                        latencies.append(time.perf_counter() - started)
+                    else:
+                        errors[status] = errors.get(status, 0) + 1
+
+            # Warmup: mở connection pool, làm nóng cache JWT...
+            warmup_deadline = time.perf_counter() + self.args.warmup
+            await asyncio.gather(*(worker(warmup_deadline, False) for _ in range(concurrency)))
+
+            before = proc_status(self.gateway_pid)
+            started = time.perf_counter()
+            deadline = started + self.args.duration
+            await asyncio.gather(*(worker(deadline, True) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            after = proc_status(self.gateway_pid)
+
+        latencies.sort()
+        completed = len(latencies) + sum(errors.values())
+        return {
+            "scenario": scenario.name,
+            "concurrency": concurrency,
+            "requests": completed,
+            "rps": completed / elapsed,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "errors": {str(k): v for k, v in errors.items()},
+            "gateway_cpu_us_per_req": (after["cpu"] - before["cpu"]) / max(completed, 1) * 1e6,
+            "gateway_rss_mb": after["VmRSS"],
+            "gateway_peak_rss_mb": after["VmHWM"],
+        }
+
+
+def print_row(result: dict):
+    errors = sum(result["errors"].values())
+    print(
+        f"{result['scenario']:<12} {result['concurrency']:>5} {result['rps']:>9.0f} "
+        f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+        f"{errors:>7} {result['gateway_cpu_us_per_req']:>9.0f} "
+        f"{result['gateway_rss_mb']:>7.1f} {result['gateway_peak_rss_mb']:>7.1f}"
+    )
+
+
+async def run(args):
+    scenarios = [SCENARIOS[name] for name in args.scenarios.split(",")]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    test = LoadTest(args)
+    test.start()
+    results = []
+    try:
+        print(f"upstream latency {args.latency_ms}ms, payload {args.payload_bytes}B, "
+              f"{args.duration}s per level (+{args.warmup}s warmup)\n")
+        print(f"{'scenario':<12} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'errors':>7} {'cpu us/r':>9} {'rss MB':>7} {'peak MB':>7}")
+        for scenario in scenarios:
+            for concurrency in levels:
+                result = await test.run_level(scenario, concurrency)
+                results.append(result)
+                print_row(result)
+    finally:
+        test.stop()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gateway load test against in-process stub upstreams")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,16,64", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds measured per level")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds of warmup per level")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="stub upstream latency")
+    parser.add_argument("--payload-bytes", type=int, default=2048, help="stub upstream response size")
+    parser.add_argument("--upload-bytes", type=int, default=200 * 1024, help="size of each uploaded file")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
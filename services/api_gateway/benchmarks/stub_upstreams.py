@@ -0,0 +1,61 @@
+"""Upstream giả cho load test: auth, cinema và seatbooking trên 127.0.0.1.
+
+Mỗi service là một ASGI app tối giản (không framework) để chi phí upstream gần như
+chỉ còn latency cấu hình; mọi path trả cùng một JSON có kích thước cho trước.
+
+Chạy riêng (benchmarks.loadtest tự khởi động nó trong một process con):
+    python -m benchmarks.stub_upstreams --ports 18102,18103,18104 --latency-ms 5 --payload-bytes 2048
+"""
+import json
+import asyncio
+import argparse
+import uvicorn
+
+SERVICES = ("auth", "cinema", "seatbooking")
+
+
+def make_stub(name: str, latency: float, payload_bytes: int):
+    body = json.dumps({"service": name, "data": "x" * payload_bytes}).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        # Đọc hết body request (upload, POST admin) như service thật
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get("more_body", False)
+        if latency:
+            await asyncio.sleep(latency)
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+async def serve(ports, latency: float, payload_bytes: int):
+    servers = [
+        uvicorn.Server(uvicorn.Config(
+            make_stub(name, latency, payload_bytes), host="127.0.0.1", port=port,
+            lifespan="off", access_log=False, log_level="warning",
+        ))
+        for name, port in zip(SERVICES, ports)
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub upstream services for gateway load tests")
+    parser.add_argument("--ports", required=True, help="auth,cinema,seatbooking ports")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--payload-bytes", type=int, default=2048)
+    args = parser.parse_args()
+    ports = [int(p) for p in args.ports.split(",")]
+    if len(ports) != len(SERVICES):
+        parser.error(f"--ports needs {len(SERVICES)} ports")
+    asyncio.run(serve(ports, args.latency_ms / 1000, args.payload_bytes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import os
+import time
+import tempfile
+
+# Test không gọi upstream thật và không để rate limit / access log ảnh hưởng kết quả
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("ACCESS_LOG_ENABLED", "false")
+os.environ.setdefault("REVOCATION_ENABLED", "false")
+# Upload dùng LocalStorage + index SQLite tạm, không tạo variant (Pillow là tuỳ chọn)
+os.environ.setdefault("UPLOAD_STORAGE", "local")
+os.environ.setdefault("LOCAL_STORAGE_ROOT", tempfile.mkdtemp(prefix="gateway-media-"))
+os.environ.setdefault("UPLOAD_INDEX_PATH", os.path.join(tempfile.mkdtemp(prefix="gateway-index-"), "uploads.db"))
+os.environ.setdefault("IMAGE_VARIANTS", "false")
+
+import jwt
+import pytest
+from app.routes.baseRequest import SECRET_KEY, ALGORITHM
+
+
+def make_token(role: str = "customer", sub: str = "1") -> str:
+    payload = {"sub": sub, "role": role, "exp": int(time.time()) + 600}
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+
+@pytest.fixture
+def auth_header():
+    def _header(role: str = "customer"):
+        return {"Authorization": f"Bearer {make_token(role)}"}
+    return _header
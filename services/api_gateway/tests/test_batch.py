@@ -0,0 +1,40 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.compression import CompressionMiddleware
+from app.routes.batch_routes import router as batch_router
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+    app.include_router(batch_router, prefix="/api/v1/batch")
+
+    @app.get("/api/v1/items")
+    async def items(request: Request):
+        # Đủ lớn để CompressionMiddleware nén nếu sub-request xin gzip/br
+        return {"accept_encoding": request.headers.get("accept-encoding"), "items": ["x" * 100] * 50}
+
+    return TestClient(app)
+
+
+def test_sub_requests_are_not_compressed(client):
+    resp = client.post("/api/v1/batch", json={"requests": [{"path": "/api/v1/items"}]})
+    assert resp.status_code == 200
+    result = resp.json()["results"][0]
+    assert result["status"] == 200
+    assert result["body"]["accept_encoding"] == "identity"
+
+
+def test_invalid_item_fails_alone(client):
+    resp = client.post("/api/v1/batch", json={"requests": [
+        {"id": "ok", "path": "/api/v1/items"},
+        {"id": "bad-path", "path": "/internal/revocations"},
+        {"id": "bad-method", "method": "TRACE", "path": "/api/v1/items"},
+    ]})
+    assert resp.status_code == 200
+    results = {r["id"]: r for r in resp.json()["results"]}
+    assert results["ok"]["status"] == 200
+    assert results["bad-path"]["status"] == 400 and "not allowed" in results["bad-path"]["body"]["detail"]
+    assert results["bad-method"]["status"] == 400
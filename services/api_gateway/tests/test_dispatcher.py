@@ -0,0 +1,55 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import Response
+from app.routes import dispatcher
+from app.routes.dispatcher import route_trie
+
+
+@pytest.fixture
+def client(monkeypatch):
+    proxied = []
+
+    async def stub_proxy(request, path, url_service, user_id=None, **options):
+        proxied.append(path)
+        return Response(b"ok")
+
+    monkeypatch.setattr(dispatcher, "proxy", stub_proxy)
+    app = FastAPI()
+    app.include_router(dispatcher.router)
+    test_client = TestClient(app)
+    test_client.proxied = proxied
+    return test_client
+
+
+def test_prefix_rule_needs_a_following_segment():
+    rule, _, matched = route_trie.match("/api/v1/users", "GET")
+    assert rule is None and not matched
+
+    rule, params, _ = route_trie.match("/api/v1/users/", "GET")
+    assert rule.pattern == "/api/v1/users/" and rule.auth == "admin"
+
+    rule, params, _ = route_trie.match("/api/v1/users/me", "GET")
+    assert rule.pattern == "/api/v1/users/{path:path}" and params == {"path": "me"}
+
+
+def test_bare_parent_path_redirects_to_exact_rule(client):
+    resp = client.get("/api/v1/promotions", follow_redirects=False)
+    assert resp.status_code == 307
+    assert resp.headers["location"].endswith("/api/v1/promotions/")
+
+
+def test_non_admin_cannot_list_users(client, auth_header):
+    resp = client.get("/api/v1/users", headers=auth_header("customer"), follow_redirects=False)
+    assert resp.status_code == 307
+    assert client.proxied == []
+
+    resp = client.get("/api/v1/users", headers=auth_header("customer"))
+    assert resp.status_code == 403
+    assert client.proxied == []
+
+
+def test_admin_can_list_users(client, auth_header):
+    resp = client.get("/api/v1/users/", headers=auth_header("admin"))
+    assert resp.status_code == 200
+    assert client.proxied == ["/api/v1/users/"]
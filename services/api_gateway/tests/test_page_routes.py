@@ -0,0 +1,38 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routes import page_routes
+
+
+class FakeCinema:
+    name = "cinema"
+
+    def __init__(self, responses):
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses[request.url.path]))
+
+    async def call(self, send):
+        return await send(self.client, {})
+
+
+@pytest.fixture
+def client(monkeypatch):
+    html = httpx.Response(200, text="<html>Bad gateway</html>", headers={"content-type": "text/html"})
+    responses = {
+        "/api/v1/movies/1": httpx.Response(200, json={"id": "1"}),
+        "/api/v1/showtimes/movie/1/upcoming": httpx.Response(200, json=[]),
+        "/api/v1/advertisements/banners": html,
+        "/api/v1/advertisements/poster-ads": httpx.Response(200, json=[]),
+    }
+    monkeypatch.setattr(page_routes, "get_upstream", lambda url: FakeCinema(responses))
+    app = FastAPI()
+    app.include_router(page_routes.router, prefix="/api/v1/pages")
+    return TestClient(app)
+
+
+def test_non_json_section_is_reported_not_raised(client):
+    resp = client.get("/api/v1/pages/movie/1")
+    assert resp.status_code == 200
+    page = resp.json()
+    assert page["movie"] == {"id": "1"} and page["banners"] is None
+    assert page["errors"] == {"banners": {"status": 502, "detail": "Section returned an invalid response"}}
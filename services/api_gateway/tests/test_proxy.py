@@ -0,0 +1,53 @@
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.routes import baseRequest
+
+
+class FakeUpstream:
+    """Upstream gửi thẳng tới MockTransport, ghi lại request nhận được"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.received = []
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.received.append((request.method, dict(request.headers), request.content))
+        return httpx.Response(200, stream=httpx.ByteStream(b"ok"))
+
+    async def call(self, send):
+        return await send(self.client, {})
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    upstream = FakeUpstream()
+    monkeypatch.setattr(baseRequest, "get_upstream", lambda url: upstream)
+    return upstream
+
+
+@pytest.fixture
+def client(upstream):
+    app = FastAPI()
+
+    @app.api_route("/{path:path}", methods=["GET", "DELETE", "POST"])
+    async def route(request: Request, path: str):
+        return await baseRequest.proxy(request, "/" + path, "http://upstream", stream=True)
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("method", ["GET", "DELETE"])
+def test_stream_mode_sends_no_body_without_one(client, upstream, method):
+    assert client.request(method, "/items/1").status_code == 200
+    sent_method, headers, body = upstream.received[-1]
+    assert sent_method == method and body == b""
+    assert "transfer-encoding" not in headers
+
+
+def test_stream_mode_streams_declared_body(client, upstream):
+    assert client.post("/items", content=b'{"name": "x"}').status_code == 200
+    assert upstream.received[-1][2] == b'{"name": "x"}'
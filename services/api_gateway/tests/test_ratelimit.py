@@ -0,0 +1,34 @@
+import pytest
+from starlette.requests import Request
+from app.ratelimit import client_ip
+
+
+def _request(peer: str, headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": (peer, 12345),
+    })
+
+
+def test_ignores_forwarded_headers_from_untrusted_peer():
+    request = _request("203.0.113.7", {"X-Forwarded-For": "1.2.3.4", "X-Real-IP": "1.2.3.4"})
+    assert client_ip(request) == "203.0.113.7"
+
+
+@pytest.mark.parametrize("forwarded, expected", [
+    # nginx nối IP nó thấy vào cuối; phần client tự gửi bên trái bị bỏ qua
+    ("1.2.3.4, 198.51.100.9", "198.51.100.9"),
+    ("198.51.100.9", "198.51.100.9"),
+    # Nhiều proxy tin cậy nối tiếp: bỏ qua các hop nội bộ ở bên phải
+    ("198.51.100.9, 10.0.0.3", "198.51.100.9"),
+])
+def test_uses_rightmost_untrusted_hop_behind_trusted_proxy(forwarded, expected):
+    assert client_ip(_request("172.18.0.5", {"X-Forwarded-For": forwarded})) == expected
+
+
+def test_falls_back_to_real_ip_then_peer():
+    assert client_ip(_request("172.18.0.5", {"X-Real-IP": "198.51.100.9"})) == "198.51.100.9"
+    assert client_ip(_request("172.18.0.5", {})) == "172.18.0.5"
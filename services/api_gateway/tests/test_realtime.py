@@ -0,0 +1,49 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.routes import realtime_routes
+
+
+class RecordingUpstream:
+    """Ghi lại handshake gửi lên upstream rồi từ chối để test không cần seatbooking thật"""
+
+    name = "seatbooking"
+
+    def __init__(self):
+        self.handshakes = []
+
+    async def connect_websocket(self, path, headers, subprotocols, open_timeout, max_size, max_queue):
+        self.handshakes.append((path, headers))
+        raise HTTPException(status_code=502, detail="no upstream in tests")
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    upstream = RecordingUpstream()
+    monkeypatch.setattr(realtime_routes, "get_upstream", lambda url: upstream)
+    return upstream
+
+
+@pytest.fixture
+def client(upstream):
+    app = FastAPI()
+    app.include_router(realtime_routes.router, prefix="/api/v1/realtime")
+    return TestClient(app)
+
+
+def test_client_identity_headers_and_token_are_not_forwarded(client, upstream, auth_header):
+    token = auth_header("customer")["Authorization"].split(" ")[1]
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(
+            f"/api/v1/realtime/socket.io/?EIO=4&transport=websocket&token={token}",
+            headers={"X-User-Id": "999", "X-User-Role": "admin", "X-Trace": "abc"},
+        ):
+            pass
+    path, headers = upstream.handshakes[0]
+    assert path == "/socket.io/?EIO=4&transport=websocket"
+    names = [name.lower() for name, _ in headers]
+    assert ("x-user-id", "1") in [(name.lower(), value) for name, value in headers]
+    assert names.count("x-user-id") == 1
+    assert "x-user-role" not in names and "authorization" not in names
+    assert "x-trace" in names
@@ -0,0 +1,78 @@
+import hashlib
+import httpx
+import pytest
+from app import revocation
+
+
+class FakeFeed:
+    """Client giả của feed auth-service trên một list id -> token (giống get_revocations_since)"""
+
+    def __init__(self):
+        self.rows = {}
+        self.requests = []
+
+    async def get(self, url, headers, params):
+        since, limit = params["since"], params["limit"]
+        self.requests.append(since)
+        ids = sorted(i for i in self.rows if i > since)[:limit]
+        body = {
+            "cursor": ids[-1] if ids else since,
+            "more": len(ids) == limit,
+            "revoked": [[hashlib.sha256(self.rows[i].encode()).hexdigest(), 4102444800] for i in ids],
+        }
+        return httpx.Response(200, json=body, request=httpx.Request("GET", url))
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def feed():
+    return FakeFeed()
+
+
+@pytest.mark.anyio
+async def test_sync_picks_up_rows_committed_behind_cursor(feed, monkeypatch):
+    monkeypatch.setattr(revocation, "REVOCATION_FEED_OVERLAP", 10)
+    revoked = revocation.RevocationSet()
+    # id 3 được cấp trước id 4 nhưng commit sau
+    feed.rows = {1: "a", 2: "b", 4: "d"}
+    await revoked.sync(feed)
+    assert revoked.cursor == 4 and not revoked.is_revoked("c")
+
+    feed.rows[3] = "c"
+    await revoked.sync(feed)
+    assert revoked.is_revoked("c")
+    assert revoked.cursor == 4
+    assert revoked.stats()["revoked"] == 4
+
+
+@pytest.mark.anyio
+async def test_sync_pages_terminate_with_overlap(feed, monkeypatch):
+    monkeypatch.setattr(revocation, "REVOCATION_FEED_OVERLAP", 5)
+    monkeypatch.setattr(revocation, "REVOCATION_PAGE_SIZE", 3)
+    revoked = revocation.RevocationSet()
+    feed.rows = {i: f"token-{i}" for i in range(1, 11)}
+    await revoked.sync(feed)
+    await revoked.sync(feed)
+    assert revoked.cursor == 10
+    # Lần 2 lùi 5 id rồi đi tiếp theo cursor của từng trang
+    assert feed.requests == [0, 3, 6, 9, 5, 8]
+
+
+@pytest.mark.anyio
+async def test_sync_is_not_started_without_internal_token(monkeypatch):
+    # auth-service không mở feed khi thiếu token: không poll để tránh lỗi lặp lại
+    monkeypatch.setattr(revocation, "REVOCATION_ENABLED", True)
+    monkeypatch.setattr(revocation, "INTERNAL_API_TOKEN", None)
+    revocation.start()
+    assert revocation._task is None
+
+    monkeypatch.setattr(revocation, "INTERNAL_API_TOKEN", "secret")
+    revocation.start()
+    try:
+        assert revocation._task is not None
+    finally:
+        revocation.stop()
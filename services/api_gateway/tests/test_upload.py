@@ -0,0 +1,192 @@
+import os
+import time
+import base64
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import storage
+from app.routes.upload_routes import router as upload_router
+
+# PNG 1x1 hợp lệ
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+)
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    backend = storage.LocalStorage(root=str(tmp_path), base_url="/media", folder="test")
+    previous = storage.get_storage()
+    storage.set_storage(backend)
+    yield backend
+    storage.set_storage(previous)
+
+
+@pytest.fixture
+def app(local_storage):
+    app = FastAPI()
+    app.include_router(upload_router, prefix="/api/v1/upload")
+    return app
+
+
+@pytest.fixture
+def client(app, auth_header):
+    # Giữ event loop của TestClient giữa các request để job batch chạy nền được
+    with TestClient(app, headers=auth_header("admin")) as test_client:
+        yield test_client
+
+
+def _png(seed: bytes = b""):
+    # Thêm byte sau IEND để mỗi test có nội dung (SHA-256) riêng
+    return PNG + seed
+
+
+def test_storage_backend_is_abstract():
+    with pytest.raises(TypeError):
+        storage.StorageBackend()
+
+
+def test_upload_stores_file_locally(client, local_storage):
+    resp = client.post("/api/v1/upload/", files={"file": ("poster.png", _png(b"upload"), "image/png")})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["success"] and body["duplicate"] is False
+    assert body["url"].startswith("/media/test/") and body["url"].endswith(".png")
+    with open(os.path.join(local_storage.root, body["public_id"] + ".png"), "rb") as f:
+        assert f.read() == _png(b"upload")
+
+
+def test_duplicate_upload_returns_existing_url(client, local_storage):
+    first = client.post("/api/v1/upload/", files={"file": ("a.png", _png(b"dup"), "image/png")}).json()
+    second = client.post("/api/v1/upload/", files={"file": ("b.png", _png(b"dup"), "image/png")}).json()
+    assert second["duplicate"] is True
+    assert second["url"] == first["url"]
+    assert len(os.listdir(os.path.join(local_storage.root, "test"))) == 1
+
+
+def test_upload_requires_admin(app, auth_header):
+    with TestClient(app) as anonymous:
+        resp = anonymous.post("/api/v1/upload/", files={"file": ("a.png", _png(b"anon"), "image/png")})
+        assert resp.status_code == 401
+    with TestClient(app, headers=auth_header("user")) as user:
+        resp = user.post("/api/v1/upload/", files={"file": ("a.png", _png(b"user"), "image/png")})
+        assert resp.status_code == 403
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/poster.png",
+    "http://localhost:8000/poster.png",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.5/poster.png",
+    "http://[::1]/poster.png",
+    "http://[::ffff:127.0.0.1]/poster.png",
+    "file:///etc/passwd",
+])
+def test_upload_url_rejects_internal_targets(client, url):
+    resp = client.post("/api/v1/upload/upload-url", json={"image_url": url})
+    assert resp.status_code == 400
+
+
+@pytest.fixture
+def mock_fetch(monkeypatch):
+    """fetch_image qua MockTransport; host được "resolve" theo bảng thay vì DNS thật"""
+    state = {"checked": [], "sent": [], "resolve": {}, "handler": None}
+
+    def check(url):
+        state["checked"].append(url)
+        address = state["resolve"][httpx.URL(url).host]
+        if address.startswith(("127.", "169.254.")):
+            raise storage.StorageError("Image URL must point to a public host", 400)
+        return address
+
+    def handler(request):
+        state["sent"].append(request)
+        return state["handler"](request)
+
+    monkeypatch.setattr(storage, "_check_fetch_url", check)
+    transport = httpx.MockTransport(handler)
+    real_client = httpx.Client
+    monkeypatch.setattr(storage.httpx, "Client", lambda **kwargs: real_client(transport=transport, **kwargs))
+    return state
+
+
+def test_fetch_connects_to_validated_address(mock_fetch):
+    # Không resolve lại hostname lúc kết nối: DNS rebinding không đổi được IP đã kiểm tra
+    mock_fetch["resolve"] = {"images.example.com": "93.184.216.34"}
+    mock_fetch["handler"] = lambda request: httpx.Response(
+        200, headers={"content-type": "image/png"}, stream=httpx.ByteStream(PNG)
+    )
+    fileobj, content_type, _ = storage.fetch_image("https://images.example.com/poster.png?v=2")
+    with fileobj:
+        assert fileobj.read() == PNG
+    request = mock_fetch["sent"][0]
+    assert str(request.url) == "https://93.184.216.34/poster.png?v=2"
+    assert request.headers["host"] == "images.example.com"
+    assert request.extensions["sni_hostname"] == "images.example.com"
+
+
+def test_fetch_revalidates_redirect_target(mock_fetch):
+    # Host public redirect về địa chỉ nội bộ: bước redirect cũng phải bị chặn
+    mock_fetch["resolve"] = {"images.example.com": "93.184.216.34", "metadata.example.com": "169.254.169.254"}
+    mock_fetch["handler"] = lambda request: httpx.Response(
+        302, headers={"location": "http://metadata.example.com/latest/meta-data/"}
+    )
+    with pytest.raises(storage.StorageError):
+        storage.fetch_image("http://images.example.com/poster.png")
+    assert mock_fetch["checked"] == ["http://images.example.com/poster.png",
+                                     "http://metadata.example.com/latest/meta-data/"]
+    assert len(mock_fetch["sent"]) == 1
+
+
+def test_rejects_non_image_type(client):
+    resp = client.post("/api/v1/upload/", files={"file": ("a.txt", b"hello", "text/plain")})
+    assert resp.status_code == 400
+
+
+def test_rejects_non_image_content(client):
+    # content-type khai báo là ảnh nhưng nội dung không phải: bị chặn trước khi tới storage/Pillow
+    resp = client.post("/api/v1/upload/", files={"file": ("fake.png", b"<svg onload=alert(1)>", "image/png")})
+    assert resp.status_code == 415
+
+
+def test_variant_keys_follow_original(client, local_storage, monkeypatch):
+    pytest.importorskip("PIL")
+    monkeypatch.setattr(storage.image_variants, "VARIANTS_ENABLED", True)
+    body = client.post("/api/v1/upload/", files={"file": ("v.png", _png(b"variants"), "image/png")}).json()
+    stem = body["url"].rsplit(".", 1)[0]
+    assert body["variants"]["card"]["url"] == f"{stem}-card.png"
+    assert body["variants"]["card"]["webp"] == f"{stem}-card-webp.webp"
+    for url in (body["variants"]["thumbnail"]["url"], body["variants"]["hero"]["webp"]):
+        assert os.path.exists(os.path.join(local_storage.root, url[len("/media/"):]))
+
+
+def test_requires_file_field(client):
+    resp = client.post("/api/v1/upload/", files={"other": ("a.png", _png(), "image/png")})
+    assert resp.status_code == 422
+
+
+def test_rejects_body_over_size_cap(client, monkeypatch):
+    from app.routes import upload_routes
+    monkeypatch.setattr(upload_routes, "MAX_UPLOAD_SIZE", 1024)
+    monkeypatch.setattr(upload_routes, "MULTIPART_OVERHEAD", 512)
+    resp = client.post("/api/v1/upload/", files={"file": ("big.png", _png(b"x" * 4096), "image/png")})
+    assert resp.status_code == 413
+
+
+def test_batch_job_reports_per_item_status(client):
+    files = [
+        ("files", ("one.png", _png(b"batch-1"), "image/png")),
+        ("files", ("two.txt", b"not an image", "text/plain")),
+    ]
+    resp = client.post("/api/v1/upload/batch", files=files)
+    assert resp.status_code == 202
+    status_url = resp.json()["status_url"]
+
+    for _ in range(100):
+        job = client.get(status_url).json()
+        if job["status"] == "done":
+            break
+        time.sleep(0.02)
+    statuses = sorted(item["status"] for item in job["items"])
+    assert statuses == ["failed", "succeeded"]
@@ -0,0 +1,36 @@
+import httpx
+import pytest
+from app.upstreams import Upstream, UpstreamConfig
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def upstream():
+    upstream = Upstream(UpstreamConfig("test", "TEST_UPSTREAM", "http://test"))
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=httpx.ByteStream(b"body")))
+    upstream.replicas[0].client = httpx.AsyncClient(transport=transport)
+    return upstream
+
+
+@pytest.mark.anyio
+async def test_buffered_call_releases_slot_immediately(upstream):
+    resp = await upstream.call(lambda client, extensions: client.get("http://test/", extensions=extensions))
+    assert resp.content == b"body"
+    assert upstream.bulkhead.in_flight == 0 and upstream.replicas[0].outstanding == 0
+
+
+@pytest.mark.anyio
+async def test_streamed_call_holds_slot_until_closed(upstream):
+    def send(client, extensions):
+        return client.send(client.build_request("GET", "http://test/", extensions=extensions), stream=True)
+
+    resp = await upstream.call(send)
+    # Body còn đang được relay: connection upstream vẫn bận
+    assert upstream.bulkhead.in_flight == 1 and upstream.replicas[0].outstanding == 1
+    assert [chunk async for chunk in resp.aiter_raw()] == [b"body"]
+    await resp.aclose()
+    assert upstream.bulkhead.in_flight == 0 and upstream.replicas[0].outstanding == 0
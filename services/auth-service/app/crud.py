@@ -3,8 +3,9 @@ from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_
 from typing import Optional, List, Tuple
-from app.models import Token, User, Type
+from app.models import Token, TokenRevocation, User, Type
 from app import schemas
+import hashlib
 import uuid
 
 
@@ -22,13 +23,34 @@ async def save_token(db: AsyncSession, user_id: str, token: str, expired_at: dat
     await db.refresh(t)
     return t
 
+def hash_token(token: str) -> str:
+    """Id của token trong feed thu hồi (gateway tính lại từ token client gửi lên)"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
 async def revoke_token(db: AsyncSession, token: str):
     result = await db.execute(select(Token).filter(Token.token == token))
     t = result.scalar_one_or_none()
     if t:
+        if not t.is_revoked:
+            db.add(TokenRevocation(token_hash=hash_token(token), expired_at=t.expired_at))
         t.is_revoked = True
         await db.commit()
         await db.refresh(t)
+
+async def get_revocations_since(db: AsyncSession, since: int, limit: int) -> List[TokenRevocation]:
+    """Các lần thu hồi sau cursor `since`, bỏ token đã hết hạn (gateway tự từ chối).
+
+    id được cấp lúc INSERT nhưng transaction có thể commit không theo thứ tự id, nên hàng
+    id nhỏ có thể xuất hiện sau khi cursor đã vượt qua: gateway đọc lại một cửa sổ phía sau
+    cursor (REVOCATION_FEED_OVERLAP) và tự bỏ trùng.
+    """
+    result = await db.execute(
+        select(TokenRevocation)
+        .filter(TokenRevocation.id > since, TokenRevocation.expired_at > datetime.utcnow())
+        .order_by(TokenRevocation.id)
+        .limit(limit)
+    )
+    return result.scalars().all()
         
 async def is_token_revoked(db: AsyncSession, token: str):
     result = await db.execute(select(Token).filter(Token.token == token))
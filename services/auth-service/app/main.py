@@ -10,7 +10,9 @@ from contextlib import asynccontextmanager
 from app.routers.auth import router as auth_router
 from app.routers.users import router as users_router
 from app.routers.types import router as types_router
+from app.routers.internal import router as internal_router
 from app.database import Base, engine
+from app.responses import CompactResponse, CompactEncodingMiddleware
 
 load_dotenv()
 
@@ -25,7 +27,8 @@ async def lifespan(app: FastAPI):
     await engine.dispose()
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Auth Service", version="1.0.0", lifespan=lifespan)
+    app = FastAPI(title="Auth Service", version="1.0.0", lifespan=lifespan,
+                  default_response_class=CompactResponse)
     
     # --- 2. CẤU HÌNH CORS ---
     app.add_middleware(
@@ -36,10 +39,15 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Gateway xin msgpack qua header X-Internal-Encoding (app/responses.py)
+    app.add_middleware(CompactEncodingMiddleware)
+
     # --- 3. ĐĂNG KÝ ROUTER ---
     app.include_router(auth_router, prefix="/api/v1/auth", tags=["Authentication"])
     app.include_router(users_router, prefix="/api/v1/users", tags=["Users"])
     app.include_router(types_router, prefix="/api/v1/types", tags=["Types"])
+    # Route nội bộ cho gateway (feed thu hồi token), gateway không proxy /internal ra ngoài
+    app.include_router(internal_router, prefix="/internal", tags=["Internal"])
     
     # --- 4. HEALTH CHECK ---
     @app.get("/health")
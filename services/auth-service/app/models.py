@@ -41,6 +41,16 @@ class Token(Base):
     expired_at = Column(DateTime, nullable=False)
 
 
+class TokenRevocation(Base):
+    """Feed thu hồi token cho gateway: id tăng dần làm cursor, token lưu dạng SHA-256"""
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String(64), nullable=False)
+    expired_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class Type(Base):
     __tablename__ = "types"
 
@@ -0,0 +1,37 @@
+import os
+import hmac
+import calendar
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+from app import crud, database
+
+load_dotenv()
+router = APIRouter()
+
+# Đặt giống nhau ở gateway và auth-service để chỉ gateway đọc được các route nội bộ
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+
+
+def verify_internal(x_internal_token: Optional[str] = Header(None)):
+    # Không cấu hình token thì route nội bộ coi như không tồn tại (không mở cho mọi người)
+    if not INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, INTERNAL_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@router.get("/revocations", dependencies=[Depends(verify_internal)])
+async def revocation_feed(
+    since: int = Query(0, ge=0, description="Cursor của lần sync trước"),
+    limit: int = Query(1000, ge=1, le=5000),
+    db: AsyncSession = Depends(database.get_db),
+):
+    """Feed thu hồi token tăng dần cho gateway: [sha256 của token, thời điểm hết hạn (epoch)]"""
+    rows = await crud.get_revocations_since(db, since, limit)
+    return {
+        "cursor": rows[-1].id if rows else since,
+        "more": len(rows) == limit,
+        "revoked": [[r.token_hash, calendar.timegm(r.expired_at.utctimetuple())] for r in rows],
+    }
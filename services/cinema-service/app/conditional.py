@@ -0,0 +1,71 @@
+"""
+ETag / If-None-Match cho các GET của service.
+
+Response GET 200 trả một lần (không stream) được gắn ETag strong tính từ body; request có
+If-None-Match khớp nhận 304 không body. Gateway chuyển If-None-Match của client lên đây và
+relay nguyên ETag/304, nên route gateway stream (không hash body) vẫn có conditional GET.
+"""
+import hashlib
+
+# Header giữ lại trong 304 (RFC 9110 15.4.5)
+_NOT_MODIFIED_HEADERS = {b"etag", b"cache-control", b"content-location", b"expires", b"vary", b"last-modified"}
+
+
+def _opaque(tag: bytes) -> bytes:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith(b"W/") else tag
+
+
+def _matches(if_none_match: bytes, etag: bytes) -> bool:
+    if if_none_match.strip() == b"*":
+        return True
+    return any(_opaque(tag) == etag for tag in if_none_match.split(b","))
+
+
+class ConditionalGetMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        if_none_match = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value
+                break
+
+        state = {"start": None, "passthrough": False}
+
+        async def send_wrapper(message):
+            if state["passthrough"]:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                if message["status"] != 200 or any(k == b"etag" for k, _ in message["headers"]):
+                    state["passthrough"] = True
+                    await send(message)
+                else:
+                    state["start"] = message
+                return
+            start = state["start"]
+            state["passthrough"] = True
+            if message.get("more_body", False):
+                # StreamingResponse: không buffer để hash
+                await send(start)
+                await send(message)
+                return
+            body = message.get("body", b"")
+            etag = b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+            if if_none_match is not None and _matches(if_none_match, etag):
+                headers = [(k, v) for k, v in start["headers"]
+                           if k in _NOT_MODIFIED_HEADERS or k.startswith(b"access-control-")]
+                await send({"type": "http.response.start", "status": 304, "headers": headers + [(b"etag", etag)]})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            start["headers"] = list(start["headers"]) + [(b"etag", etag)]
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -14,6 +14,8 @@ from app.routers.revenue import router as revenue_router
 from app.routers.advertisements import router as advertisements_router
 
 from app.database import Base, engine
+from app.responses import CompactResponse, CompactEncodingMiddleware
+from app.conditional import ConditionalGetMiddleware
 
 load_dotenv()
 
@@ -27,7 +29,8 @@ async def lifespan(app: FastAPI):
     await engine.dispose()
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Cinema Service", version="1.0.0", lifespan=lifespan)
+    app = FastAPI(title="Cinema Service", version="1.0.0", lifespan=lifespan,
+                  default_response_class=CompactResponse)
     
     app.add_middleware(
         CORSMiddleware,
@@ -36,6 +39,10 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # Gateway xin msgpack qua header X-Internal-Encoding (app/responses.py)
+    app.add_middleware(CompactEncodingMiddleware)
+    # ETag + 304 cho GET (app/conditional.py)
+    app.add_middleware(ConditionalGetMiddleware)
     
     app.include_router(movies_router, prefix="/api/v1/movies", tags=["Movie"])
     app.include_router(cinemas_router, prefix="/api/v1/cinemas", tags=["Cinema"])
@@ -0,0 +1,58 @@
+"""
+Response class dùng chung cho các route của service.
+
+Mặc định trả JSON (qua orjson nếu có). Khi gateway gửi header nội bộ
+`X-Internal-Encoding: msgpack` thì trả body msgpack (application/x-msgpack), gọn hơn và
+encode/decode nhanh hơn JSON; gateway tự chuyển lại JSON cho client ở edge.
+Client gọi thẳng service (không qua gateway) vẫn nhận JSON như cũ.
+"""
+from contextvars import ContextVar
+from typing import Any, Optional
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson là tuỳ chọn, không có thì dùng json chuẩn
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # không có msgpack thì luôn trả JSON
+    msgpack = None
+
+INTERNAL_ENCODING_HEADER = b"x-internal-encoding"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+_encoding: ContextVar[Optional[str]] = ContextVar("internal_encoding", default=None)
+
+
+class CompactEncodingMiddleware:
+    """Đọc header X-Internal-Encoding của request, lưu vào context cho CompactResponse"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or msgpack is None:
+            await self.app(scope, receive, send)
+            return
+        encoding = None
+        for name, value in scope["headers"]:
+            if name == INTERNAL_ENCODING_HEADER:
+                encoding = value.decode("latin-1").strip().lower()
+                break
+        token = _encoding.set(encoding)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _encoding.reset(token)
+
+
+class CompactResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if _encoding.get() == "msgpack":
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return msgpack.packb(content, use_bin_type=True)
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return super().render(content)